@@ -0,0 +1,35 @@
+"""
+Escrita atômica de arquivos: o conteúdo vai para um arquivo temporário na
+mesma pasta, sincronizado no disco e renomeado por cima do destino, então
+leitores e execuções interrompidas nunca veem um arquivo pela metade (sobra
+sempre a versão completa anterior). Usada pelos checkpoints, pelo trace de
+convergência e pelo cache das instâncias.
+"""
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb") -> Iterator[IO]:
+    """Abre o arquivo temporário; ao sair do with sem erro ele substitui path
+
+    Args:
+        path (str): arquivo de destino
+        mode (str, optional): modo de abertura ("wb" ou "w"). Defaults to "wb".
+
+    Yields:
+        IO: arquivo temporário aberto para escrita
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,255 @@
+"""
+Benchmark de desempenho sobre as instâncias de instances/A, B e F. Para cada
+instância mede o tempo de leitura do .vrp, o tempo de construção da matriz de
+distâncias, as iterações por segundo do SimulatedAnnealing no modo
+determinístico (semente, limite de iterações e solução inicial fixos, então todas
+as máquinas e versões fazem exatamente o mesmo trabalho), o pico de memória e o gap para o
+ótimo com orçamentos de tempo fixos. Também mede o tempo de partida a frio
+de um `main.py solve` curto em um processo novo, que precisa caber em
+COLD_START_BUDGET. O resultado é gravado em JSON e pode ser comparado com um
+baseline gravado antes para pegar regressões:
+
+    python benchmark.py --output bench.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from time import perf_counter, strftime
+import numpy as np
+from cvrp import CVRP
+from simulated_annealing import SimulatedAnnealing
+from main import DEFAULT_PARAMS
+
+# solução inicial da medição de velocidade: determinística, para o tempo de construção
+# (que entra no total_time_spent) não variar entre as repetições como o do "random"
+SPEED_CONSTRUCTOR = "savings"
+
+# tempo máximo (s) de um solve de uma iteração pela linha de comando, do início do
+# processo até a saída (imports, leitura da instância e matriz)
+COLD_START_BUDGET = 1.0
+
+# métrica -> (sentido da regressão, tolerância relativa, diferença absoluta mínima);
+# a diferença absoluta evita acusar ruído em tempos de poucos milissegundos
+REGRESSION_RULES = {
+    "load_time": ("higher", 0.25, 0.005),
+    "matrix_time": ("higher", 0.25, 0.005),
+    "iterations_per_second": ("lower", 0.10, 0.0),
+    "peak_memory": ("higher", 0.10, 1 << 20),
+    # o gap com limite de tempo depende de quantas iterações couberam, varia entre execuções
+    "gap": ("higher", 0.0, 0.05),
+    "cold_start": ("higher", 0.25, 0.05),
+}
+
+
+def instance_paths(root: str = "./instances", folders: tuple[str, ...] = ("A", "B", "F")) -> list[str]:
+    """Arquivos .vrp das pastas, em ordem
+
+    Args:
+        root (str, optional): pasta das instâncias. Defaults to "./instances".
+        folders (tuple[str, ...], optional): subpastas. Defaults to ("A", "B", "F").
+
+    Returns:
+        list[str]: paths dos arquivos .vrp
+    """
+    return [os.path.join(root, folder, name)
+            for folder in folders
+            for name in sorted(os.listdir(os.path.join(root, folder))) if name.endswith(".vrp")]
+
+
+def benchmark_instance(instance_path: str, iterations: int = 20000, seed: int = 0,
+                       time_budgets: tuple[float, ...] = (1.0,), params: dict | None = None,
+                       repeats: int = 3) -> dict:
+    """Mede uma instância
+
+    Args:
+        instance_path (str): arquivo .vrp
+        iterations (int, optional): iterações da medição de velocidade. Defaults to 20000.
+        seed (int, optional): semente das execuções. Defaults to 0.
+        time_budgets (tuple[float, ...], optional): limites de tempo (s) das medições de gap.
+            Defaults to (1.0,).
+        params (dict | None, optional): parâmetros do SimulatedAnnealing. Defaults to DEFAULT_PARAMS.
+        repeats (int, optional): repetições das medições de tempo, vale a mais rápida
+            (a menos afetada por outros processos). Defaults to 3.
+
+    Returns:
+        dict: load_time e matrix_time (s), iterations_per_second, deterministic_cost (custo
+            da execução de velocidade, muda só se a busca mudar), peak_memory (bytes),
+            optimal_value e gap por orçamento de tempo
+    """
+    params = DEFAULT_PARAMS if params is None else params
+    load_time = matrix_time = np.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        data = CVRP.read_instance(instance_path)
+        load_time = min(load_time, perf_counter() - start)
+        start = perf_counter()
+        data["distance_matrix"] = CVRP.build_distance_matrix(data["node_coord"])
+        matrix_time = min(matrix_time, perf_counter() - start)
+
+    # pico de memória: carga, matriz, vizinhos e um trecho da busca (tracemalloc deixa
+    # tudo mais lento, então fica fora das medições de tempo)
+    tracemalloc.start()
+    instance = CVRP(instance_path)
+    SimulatedAnnealing(**params, iteration_limit=min(iterations, 2000), seed=seed).optimize(instance)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    instance = CVRP.from_data(data)
+    run_time = np.inf
+    for _ in range(repeats):
+        sa = SimulatedAnnealing(**{**params, "constructor": SPEED_CONSTRUCTOR}, iteration_limit=iterations, seed=seed)
+        sa.optimize(instance)
+        run_time = min(run_time, sa.total_time_spent)
+    result = {
+        "load_time": load_time,
+        "matrix_time": matrix_time,
+        "iterations_per_second": iterations / run_time,
+        "deterministic_cost": int(sa.best_solution_cost),
+        "peak_memory": peak_memory,
+        "optimal_value": getattr(instance, "optimal_value", None),
+        "gap": {},
+        }
+    for budget in time_budgets:
+        sa = SimulatedAnnealing(**params, time_limit=budget, seed=seed)
+        sa.optimize(instance)
+        optimal = result["optimal_value"]
+        result["gap"][str(budget)] = (sa.best_solution_cost - optimal) / optimal if optimal else None
+    return result
+
+
+def cold_start_time(instance_path: str, repeats: int = 3) -> float:
+    """Tempo de um `main.py solve` de uma iteração em um processo novo
+
+    Args:
+        instance_path (str): arquivo .vrp
+        repeats (int, optional): repetições, vale a mais rápida. Defaults to 3.
+
+    Returns:
+        float: segundos do início do processo até a saída
+    """
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    command = [sys.executable, main_path, "solve", instance_path, "--iterations", "1", "--seed", "0"]
+    best = np.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run_benchmark(paths: list[str], iterations: int = 20000, seed: int = 0,
+                  time_budgets: tuple[float, ...] = (1.0,), params: dict | None = None,
+                  repeats: int = 3) -> dict:
+    """Mede todas as instâncias
+
+    Args:
+        paths (list[str]): arquivos .vrp
+        iterations (int, optional): iterações da medição de velocidade. Defaults to 20000.
+        seed (int, optional): semente das execuções. Defaults to 0.
+        time_budgets (tuple[float, ...], optional): limites de tempo das medições de gap. Defaults to (1.0,).
+        params (dict | None, optional): parâmetros do SimulatedAnnealing. Defaults to DEFAULT_PARAMS.
+        repeats (int, optional): repetições das medições de tempo. Defaults to 3.
+
+    Returns:
+        dict: "environment", "config", "instances" (nome -> medidas), "summary" (médias) e
+            "cold_start" (tempo de partida a frio na primeira instância)
+    """
+    # só o campo do ambiente precisa do kernel (importar o numba é caro)
+    import sa_kernel
+    params = DEFAULT_PARAMS if params is None else params
+    instances = {}
+    for path in paths:
+        print(os.path.basename(path), file=sys.stderr)
+        instances[os.path.basename(path)] = benchmark_instance(path, iterations, seed, time_budgets, params, repeats)
+    summary = {metric: float(np.mean([r[metric] for r in instances.values()]))
+               for metric in ("load_time", "matrix_time", "iterations_per_second", "peak_memory")}
+    for budget in time_budgets:
+        gaps = [r["gap"][str(budget)] for r in instances.values() if r["gap"][str(budget)] is not None]
+        summary[f"gap@{budget}"] = float(np.mean(gaps)) if gaps else None
+    return {
+        "environment": {
+            "date": strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "numba": sa_kernel.NUMBA_AVAILABLE,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            },
+        "config": {"iterations": iterations, "seed": seed, "time_budgets": list(time_budgets), "params": params,
+                   "repeats": repeats, "speed_constructor": SPEED_CONSTRUCTOR},
+        "instances": instances,
+        "summary": summary,
+        "cold_start": {"instance": os.path.basename(paths[0]), "time": cold_start_time(paths[0], repeats)},
+        }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Compara o benchmark atual com o baseline (instâncias presentes nos dois)
+
+    Args:
+        current (dict): resultado de run_benchmark
+        baseline (dict): resultado gravado antes
+
+    Returns:
+        list[str]: uma descrição por regressão (vazia se não houver); o custo da
+            execução determinística diferente também é listado, indica que a busca mudou
+    """
+    problems = []
+    same_config = current["config"] == baseline["config"]
+    if current["cold_start"]["instance"] == baseline.get("cold_start", {}).get("instance"):
+        direction, tolerance, min_diff = REGRESSION_RULES["cold_start"]
+        value, base_value = current["cold_start"]["time"], baseline["cold_start"]["time"]
+        if value - base_value > max(min_diff, tolerance * base_value):
+            problems.append(f"cold_start {base_value:.6g} -> {value:.6g}")
+    for name, result in current["instances"].items():
+        base = baseline["instances"].get(name)
+        if base is None:
+            continue
+        values = [(metric, result[metric], base[metric])
+                  for metric in ("load_time", "matrix_time", "iterations_per_second", "peak_memory")]
+        values += [("gap", gap, base["gap"].get(budget)) for budget, gap in result["gap"].items()]
+        for metric, value, base_value in values:
+            if value is None or base_value is None:
+                continue
+            direction, tolerance, min_diff = REGRESSION_RULES[metric]
+            diff = value - base_value if direction == "higher" else base_value - value
+            if diff > min_diff and diff > tolerance * abs(base_value):
+                problems.append(f"{name}: {metric} {base_value:.6g} -> {value:.6g}")
+        if same_config and result["deterministic_cost"] != base["deterministic_cost"]:
+            problems.append(f"{name}: deterministic_cost {base['deterministic_cost']} -> {result['deterministic_cost']}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de desempenho do Simulated Annealing")
+    parser.add_argument("--root", default="./instances")
+    parser.add_argument("--folders", nargs="+", default=["A", "B", "F"])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-budgets", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", default=None, help="JSON de um benchmark anterior para comparar")
+    parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET)
+    args = parser.parse_args()
+
+    result = run_benchmark(instance_paths(args.root, tuple(args.folders)), args.iterations, args.seed,
+                           tuple(args.time_budgets), repeats=args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=1)
+    print(json.dumps(result["summary"], indent=1))
+    print(f"partida a frio: {result['cold_start']['time']:.3f}s")
+    problems = []
+    if result["cold_start"]["time"] > args.cold_start_budget:
+        problems.append(f"cold_start {result['cold_start']['time']:.6g} acima do limite {args.cold_start_budget}")
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            problems += compare(result, json.load(f))
+    for problem in problems:
+        print("REGRESSÃO", problem)
+    sys.exit(1 if problems else 0)
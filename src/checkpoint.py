@@ -0,0 +1,35 @@
+"""
+Checkpoints das execuções longas: o estado é serializado com pickle em um
+arquivo temporário, sincronizado no disco e renomeado por cima do checkpoint
+anterior, então uma interrupção no meio da escrita nunca deixa um checkpoint
+corrompido (sempre sobra o último completo).
+"""
+import os
+import pickle
+from atomic_file import atomic_write
+
+
+def save(path: str, state: dict):
+    """Grava o estado de forma atômica
+
+    Args:
+        path (str): arquivo do checkpoint
+        state (dict): estado serializável com pickle
+    """
+    with atomic_write(path) as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(path: str) -> dict | None:
+    """Lê um checkpoint
+
+    Args:
+        path (str): arquivo do checkpoint
+
+    Returns:
+        dict | None: estado gravado ou None se o arquivo não existe
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
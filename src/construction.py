@@ -0,0 +1,224 @@
+"""
+Heurísticas construtivas determinísticas para a solução inicial do CVRP
+(Clarke-Wright savings e sweep polar), com ajuste para o número fixo de
+caminhões da instância e fallback quando esse número não é atingido.
+"""
+import numpy as np
+from cvrp import CVRP
+
+# acima deste número de vértices o savings só considera os pares da lista de vizinhos
+SAVINGS_ALL_PAIRS_MAX_N = 2000
+# número de ângulos iniciais testados pelo sweep
+SWEEP_STARTS = 64
+# tempo máximo da solução aleatória (pedida ou usada como último recurso)
+RANDOM_FALLBACK_TIME = 10.0
+
+
+def savings(instance: CVRP) -> list[list[int]]:
+    """Clarke-Wright savings (versão paralela): começa com uma rota por cliente
+    e junta as pontas de rotas na ordem decrescente de economia
+    s_ij = d(0, i) + d(0, j) - d(i, j) enquanto a capacidade permite. O(n² log n)
+
+    Args:
+        instance (CVRP): instância do CVRP
+
+    Returns:
+        list[list[int]]: rotas (sem os depósitos), o número de rotas pode não ser o da instância
+    """
+    depot = instance.depot_i
+    n = len(instance.V)
+    demand = instance.vertex_demand
+    if instance.distance_matrix is not None and n <= SAVINGS_ALL_PAIRS_MAX_N:
+        i, j = np.triu_indices(n, 1)
+    else:
+        # pares (v, vizinho de v) sem repetição
+        i = np.repeat(np.arange(n), instance.neighbors.shape[1])
+        j = instance.neighbors.ravel().astype(np.int64)
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        i, j = np.unique(np.stack([i, j]), axis=1)
+    keep = (i != depot) & (j != depot) & (i != j)
+    i, j = i[keep], j[keep]
+    pair_dists = instance.distances.pair_dists
+    saving = pair_dists(np.full_like(i, depot), i) + pair_dists(np.full_like(j, depot), j) - pair_dists(i, j)
+    order = np.argsort(-saving, kind="stable")
+
+    routes = {v: [v] for v in range(n) if v != depot}
+    loads = {v: int(demand[v]) for v in routes}
+    route_of = {v: v for v in routes}
+    for k in order:
+        if saving[k] <= 0:
+            break
+        u, v = int(i[k]), int(j[k])
+        ru, rv = route_of[u], route_of[v]
+        if ru == rv or loads[ru] + loads[rv] > instance.truck_capacity:
+            continue
+        route_u, route_v = routes[ru], routes[rv]
+        # u e v precisam ser pontas das suas rotas
+        if route_u[-1] == u and route_v[0] == v:
+            merged = route_u + route_v
+        elif route_u[0] == u and route_v[-1] == v:
+            merged = route_v + route_u
+        elif route_u[-1] == u and route_v[-1] == v:
+            merged = route_u + route_v[::-1]
+        elif route_u[0] == u and route_v[0] == v:
+            merged = route_u[::-1] + route_v
+        else:
+            continue
+        routes[ru] = merged
+        loads[ru] += loads.pop(rv)
+        for w in routes.pop(rv):
+            route_of[w] = ru
+    return list(routes.values())
+
+
+def sweep(instance: CVRP) -> list[list[int]]:
+    """Sweep polar: ordena os clientes pelo ângulo em relação ao depósito e fecha
+    uma rota sempre que o próximo cliente não cabe. Testa SWEEP_STARTS ângulos
+    iniciais e fica com o que usa menos rotas. O(n log n + SWEEP_STARTS * n)
+
+    Args:
+        instance (CVRP): instância do CVRP
+
+    Returns:
+        list[list[int]]: rotas (sem os depósitos), o número de rotas pode não ser o da instância
+    """
+    depot = instance.depot_i
+    coords = np.asarray(instance.V, dtype=float)
+    customers = np.array([v for v in range(len(coords)) if v != depot])
+    diff = coords[customers] - coords[depot]
+    order = customers[np.argsort(np.arctan2(diff[:, 1], diff[:, 0]), kind="stable")].tolist()
+    best_routes = None
+    for start in range(0, len(order), max(1, len(order) // SWEEP_STARTS)):
+        routes, route, load = [], [], 0
+        for v in order[start:] + order[:start]:
+            if load + instance.vertex_demand[v] > instance.truck_capacity:
+                routes.append(route)
+                route, load = [], 0
+            route.append(v)
+            load += instance.vertex_demand[v]
+        routes.append(route)
+        if best_routes is None or len(routes) < len(best_routes):
+            best_routes = routes
+        if len(best_routes) <= instance.number_of_trucks:
+            break
+    return best_routes
+
+
+def bin_packing(instance: CVRP) -> list[list[int]] | None:
+    """Distribui os clientes nos caminhões por best-fit decreasing (maior demanda
+    primeiro, no caminhão mais cheio onde ainda cabe) e ordena cada rota pelo ângulo.
+    Usado quando as heurísticas de rota não chegam ao número de caminhões
+
+    Args:
+        instance (CVRP): instância do CVRP
+
+    Returns:
+        list[list[int]] | None: rotas (sem os depósitos) ou None se não couber
+    """
+    depot = instance.depot_i
+    coords = np.asarray(instance.V, dtype=float)
+    customers = sorted((v for v in range(len(coords)) if v != depot),
+                       key=lambda v: -instance.vertex_demand[v])
+    routes = [[] for _ in range(instance.number_of_trucks)]
+    loads = [0] * instance.number_of_trucks
+    for v in customers:
+        fits = [r for r in range(len(routes)) if loads[r] + instance.vertex_demand[v] <= instance.truck_capacity]
+        if not fits:
+            return None
+        r = max(fits, key=lambda r: loads[r])
+        routes[r].append(v)
+        loads[r] += instance.vertex_demand[v]
+    center = coords[depot]
+    return [sorted(route, key=lambda v: np.arctan2(*(coords[v] - center)[::-1])) for route in routes]
+
+
+def fit_routes(instance: CVRP, routes: list[list[int]]) -> list[list[int]] | None:
+    """Ajusta as rotas para o número de caminhões da instância: desfaz as rotas
+    com menor carga reinserindo os clientes na posição mais barata de outra rota
+    com folga, ou divide as rotas com mais clientes ao meio
+
+    Args:
+        instance (CVRP): instância do CVRP
+        routes (list[list[int]]): rotas (sem os depósitos)
+
+    Returns:
+        list[list[int]] | None: rotas com os depósitos ou None se não foi possível ajustar
+    """
+    depot = instance.depot_i
+    demand = instance.vertex_demand
+    pair_dists = instance.distances.pair_dists
+    routes = [list(route) for route in routes if route]
+    loads = [int(sum(demand[v] for v in route)) for route in routes]
+    while len(routes) > instance.number_of_trucks:
+        smallest = loads.index(min(loads))
+        removed = routes.pop(smallest)
+        loads.pop(smallest)
+        for v in sorted(removed, key=lambda v: -demand[v]):
+            best = None
+            for r, route in enumerate(routes):
+                if loads[r] + demand[v] > instance.truck_capacity:
+                    continue
+                # custo de inserir v entre cada par de vértices consecutivos da rota
+                prev = np.array([depot] + route)
+                succ = np.array(route + [depot])
+                vs = np.full_like(prev, v)
+                costs = pair_dists(prev, vs) + pair_dists(vs, succ) - pair_dists(prev, succ)
+                position = int(costs.argmin())
+                if best is None or costs[position] < best[0]:
+                    best = (costs[position], r, position)
+            if best is None:
+                return None
+            _, r, position = best
+            routes[r].insert(position, v)
+            loads[r] += int(demand[v])
+    while len(routes) < instance.number_of_trucks:
+        longest = max(range(len(routes)), key=lambda r: len(routes[r]))
+        if len(routes[longest]) < 2:
+            return None
+        route = routes.pop(longest)
+        loads.pop(longest)
+        half = len(route) // 2
+        for part in (route[:half], route[half:]):
+            routes.append(part)
+            loads.append(int(sum(demand[v] for v in part)))
+    return [[depot] + route + [depot] for route in routes]
+
+
+def build_initial_solution(instance: CVRP, method: str = "savings") -> list[list[int]]:
+    """Cria a solução inicial com a heurística escolhida, ajustada ao número de
+    caminhões. Se não for possível, tenta a outra heurística, depois o bin packing
+    e por último a solução aleatória. A solução aleatória é limitada a
+    RANDOM_FALLBACK_TIME segundos; com "random" que não chega a uma solução nesse
+    tempo, segue pelas heurísticas determinísticas
+
+    Args:
+        instance (CVRP): instância do CVRP
+        method (str, optional): "savings", "sweep" ou "random". Defaults to "savings".
+
+    Raises:
+        RuntimeError: nenhuma das heurísticas chegou a uma solução válida
+
+    Returns:
+        list[list[int]]: solução inicial válida
+    """
+    tried_random = method == "random"
+    if tried_random:
+        try:
+            return instance.gen_initial_sol(max_time=RANDOM_FALLBACK_TIME)
+        except RuntimeError:
+            method = "savings"
+    constructors = {"savings": savings, "sweep": sweep}
+    if method not in constructors:
+        raise ValueError(f"heurística construtiva desconhecida: {method}")
+    for name in [method] + [c for c in constructors if c != method]:
+        routes = fit_routes(instance, constructors[name](instance))
+        if routes is not None and instance.verifica_solucao(routes):
+            return routes
+    packed = bin_packing(instance)
+    if packed is not None:
+        routes = fit_routes(instance, packed)
+        if routes is not None and instance.verifica_solucao(routes):
+            return routes
+    if tried_random:
+        raise RuntimeError("nenhuma solução inicial válida encontrada")
+    return instance.gen_initial_sol(max_time=RANDOM_FALLBACK_TIME)
@@ -0,0 +1,104 @@
+"""
+Registro da convergência (custo por iteração) com memória limitada: em vez de
+um ponto por iteração são guardadas todas as novas melhores soluções e uma
+amostra do custo atual em iterações com espaçamento logarítmico (mais detalhe
+no começo, onde o custo muda mais). Os pontos ficam em arrays NumPy
+pré-alocados; se encherem, metade dos pontos amostrados é descartada e o
+espaçamento dobra. O resultado é gravado em um .npy compacto, de forma atômica
+(pode ser regravado durante a execução sem deixar um arquivo cortado).
+"""
+import numpy as np
+from atomic_file import atomic_write
+
+TRACE_DTYPE = np.dtype([("iteration", "<i8"), ("cost", "<i8"), ("best", "u1")])
+
+
+class ConvergenceTrace:
+    """
+    Pontos (iteração, custo, é nova melhor) de uma execução
+    """
+    capacity: int
+    log_step: float
+    next_sample: int
+
+    def __init__(self, capacity: int = 1 << 16, log_step: float = 1e-3):
+        """
+        Args:
+            capacity (int, optional): máximo de pontos em memória. Defaults to 1 << 16.
+            log_step (float, optional): distância relativa entre as amostras (a próxima
+                amostra depois da iteração k é em k * (1 + log_step)). Defaults to 1e-3.
+        """
+        self.capacity = capacity
+        self.log_step = log_step
+        self.next_sample = 0
+        self.__points = np.zeros(capacity, dtype=TRACE_DTYPE)
+        self.__size = 0
+
+    def record(self, iteration: int, cost: int, best: bool = False):
+        """Adiciona um ponto. Quem chama testa iteration >= next_sample antes (no laço
+        principal isso custa só uma comparação) ou passa best=True para novas melhores
+
+        Args:
+            iteration (int): número da iteração
+            cost (int): custo da solução atual
+            best (bool, optional): se é uma nova melhor solução. Defaults to False.
+        """
+        if self.__size == self.capacity:
+            self.__compact()
+        self.__points[self.__size] = (iteration, cost, best)
+        self.__size += 1
+        if iteration >= self.next_sample:
+            self.next_sample = iteration + max(1, int(iteration * self.log_step))
+
+    def __compact(self):
+        """
+        Libera metade do buffer: descarta um a cada dois pontos amostrados (e, se
+        ainda faltar espaço, uma a cada duas melhores) e dobra o espaçamento
+        """
+        points = self.__points[:self.__size]
+        sampled = np.flatnonzero(points["best"] == 0)
+        keep = np.ones(self.__size, dtype=bool)
+        keep[sampled[1::2]] = False
+        if keep.sum() > self.capacity // 2:
+            best = np.flatnonzero(keep & (points["best"] == 1))
+            keep[best[1:-1:2]] = False
+        kept = points[keep]
+        self.__size = len(kept)
+        self.__points[:self.__size] = kept
+        self.log_step *= 2
+
+    @property
+    def points(self) -> np.ndarray:
+        """
+        Pontos registrados, em ordem de iteração (array estruturado TRACE_DTYPE)
+        """
+        return self.__points[:self.__size]
+
+    def to_chart(self) -> dict[str, np.ndarray]:
+        """
+        Dados para o gráfico no formato antigo de optimize(gen_chart=True)
+        """
+        return {"iterations": self.points["iteration"], "f_obj_val": self.points["cost"]}
+
+    def save(self, path: str):
+        """Grava os pontos em .npy (de forma atômica, ver atomic_file)
+
+        Args:
+            path (str): arquivo de saída (ganha a extensão .npy, como em np.save)
+        """
+        if not path.endswith(".npy"):
+            path += ".npy"
+        with atomic_write(path) as f:
+            np.save(f, self.points)
+
+    @staticmethod
+    def load(path: str) -> np.ndarray:
+        """Lê os pontos gravados por save (em memory map)
+
+        Args:
+            path (str): arquivo .npy
+
+        Returns:
+            np.ndarray: array estruturado TRACE_DTYPE
+        """
+        return np.load(path, mmap_mode="r")
@@ -3,7 +3,12 @@ import re
 import random
 import numpy as np
 import time
-random.seed(time.time())
+from solution import Solution
+from distances import DenseDistances, LazyDistances, rounded_euclidean
+import instance_cache
+
+# perturbações de generate_new_solution, na ordem dos índices (e dos pesos em move_weights)
+MOVES = ("multiple_insertion", "two_way_swap", "two_opt", "greedy")
 
 class CVRP:
     """ 
@@ -12,20 +17,92 @@ class CVRP:
     """
     name: str
     number_of_trucks: int
-    distance_matrix: np.ndarray
+    distance_matrix: np.ndarray | None
+    distances: DenseDistances | LazyDistances
+    # tamanho da lista de vizinhos mais próximos (ver neighbors)
+    neighbors_k: int
+    # geradores das perturbações e dos lotes de candidatos (ver seed)
+    rng: random.Random
+    batch_rng: np.random.Generator
     vertex_demand: np.ndarray
     truck_capacity: int
     V: np.ndarray
     depot_i: int
     optimal_value: int
+    # quando True valida a solução completa (verifica_solucao) a cada perturbação
+    debug: bool = False
+    # número de linhas da matriz calculadas por vez (limita a memória temporária)
+    matrix_chunk_size: int = 512
+    # motivo da última perturbação desfeita por generate_new_solution ("capacity" ou "no_move")
+    rejection: str | None = None
+    # quando não é None, generate_new_solution soma aqui o tempo de "cost" e "feasibility"
+    # (também a checagem de capacidade da troca granular; Instrumentation liga só nas
+    # iterações amostradas e não combina com os lotes de generate_batch_solution)
+    profile: dict[str, float] | None = None
     
     
-    def __init__(self, intance_path: str = ""):
+    def __init__(self, intance_path: str = "", matrix_dtype: str = "float64",
+                 distance_backend: str = "dense", cache_size: int = 1 << 20, neighbors_k: int = 20,
+                 cache_dir: str | None = None):
         """
         Cria uma instância do problema a partir de um arquivo
 
         Args:
             intance_path (str, optional): path para o arquivo .vrp. Defaults to "".
+            matrix_dtype (str, optional): tipo da matriz de distâncias, "float64",
+                "int32", "int16" ou "compact" (int16 quando as distâncias cabem,
+                senão int32). Defaults to "float64".
+            distance_backend (str, optional): "dense" (matriz n x n) ou "lazy"
+                (calcula as distâncias sob demanda com cache LRU, sem matriz). Defaults to "dense".
+            cache_size (int, optional): número de pares no cache do backend "lazy". Defaults to 2**20.
+            neighbors_k (int, optional): tamanho da lista de vizinhos mais próximos de cada
+                vértice, usada pelas perturbações granulares. Defaults to 20.
+            cache_dir (str | None, optional): pasta do cache binário das instâncias; quando
+                informada a instância lida, a matriz e os vizinhos são guardados em .npy e
+                nas próximas vezes carregados com memory map. Defaults to None.
+        """
+        data = None
+        if cache_dir is not None:
+            data = instance_cache.load(intance_path, cache_dir, matrix_dtype if distance_backend == "dense" else None,
+                                       neighbors_k)
+        if data is None:
+            data = CVRP.read_instance(intance_path)
+        self.__setup(data, matrix_dtype, distance_backend, cache_size, neighbors_k)
+        if cache_dir is not None:
+            # grava o que ainda não estava no cache
+            instance_cache.store(intance_path, cache_dir, self, matrix_dtype, neighbors_k)
+    
+    
+    @classmethod
+    def from_data(cls, data: dict, matrix_dtype: str = "float64", distance_backend: str = "dense",
+                  cache_size: int = 1 << 20, neighbors_k: int = 20) -> "CVRP":
+        """Cria a instância a partir dos dados já lidos (ver read_instance), sem abrir o arquivo
+
+        Args:
+            data (dict): dados da instância, pode conter "distance_matrix" e "neighbors" já calculados
+            matrix_dtype (str, optional): tipo da matriz de distâncias. Defaults to "float64".
+            distance_backend (str, optional): "dense" ou "lazy". Defaults to "dense".
+            cache_size (int, optional): número de pares no cache do backend "lazy". Defaults to 2**20.
+            neighbors_k (int, optional): tamanho da lista de vizinhos. Defaults to 20.
+
+        Returns:
+            CVRP: instância do problema
+        """
+        instance = cls.__new__(cls)
+        instance.__setup(data, matrix_dtype, distance_backend, cache_size, neighbors_k)
+        return instance
+    
+    
+    @staticmethod
+    def read_instance(intance_path: str) -> dict:
+        """Lê o arquivo .vrp
+
+        Args:
+            intance_path (str): path para o arquivo .vrp
+
+        Returns:
+            dict: name, number_of_trucks, optimal_value (None se não estiver no comentário),
+                node_coord, demand, capacity e depot
         """
         instance_dict = vrplib.read_instance(intance_path, compute_edge_weights=False)  
         # usando somente para ler o arquivo (peço para não computar os pesos)
@@ -33,36 +110,147 @@ class CVRP:
         match = re.search(r'No\s+of\s+trucks:\s*(\d+)', instance_dict["comment"])
         if match:
             # ("match com regex funcionou")
-            self.number_of_trucks = int(match.group(1))  
+            number_of_trucks = int(match.group(1))  
         else:
             # ("match não funcionou, usando nome do arquivo")
-            self.number_of_trucks = int(intance_path.split("k")[1].removesuffix(".vrp"))
-        self.__generate_distance_matrix(instance_dict)
-        self.vertex_demand = instance_dict["demand"]
-        self.truck_capacity = instance_dict["capacity"]
-        self.V = instance_dict["node_coord"]
-        self.depot_i = int(instance_dict["depot"][0])
-        self.name = instance_dict["name"]
+            number_of_trucks = int(intance_path.split("k")[1].removesuffix(".vrp"))
         
+        optimal_value = None
         match = re.search(r'Optimal\s+value:\s*(\d+)', instance_dict["comment"])
         if match:
             # ("match com regex funcionou")
-            self.optimal_value = int(match.group(1))  
+            optimal_value = int(match.group(1))  
+        return {
+            "name": instance_dict["name"],
+            "number_of_trucks": number_of_trucks,
+            "optimal_value": optimal_value,
+            "node_coord": instance_dict["node_coord"],
+            "demand": instance_dict["demand"],
+            "capacity": int(instance_dict["capacity"]),
+            "depot": int(instance_dict["depot"][0]),
+            }
+    
+    
+    def __setup(self, data: dict, matrix_dtype: str, distance_backend: str, cache_size: int, neighbors_k: int):
+        """
+        Preenche os atributos a partir dos dados da instância (ver __init__ para os argumentos)
+        """
+        self.number_of_trucks = data["number_of_trucks"]
+        match distance_backend:
+            case "dense":
+                if data.get("distance_matrix") is not None:
+                    self.distance_matrix = data["distance_matrix"]
+                else:
+                    self.distance_matrix = CVRP.build_distance_matrix(data["node_coord"], matrix_dtype)
+                self.distances = DenseDistances(self.distance_matrix)
+            case "lazy":
+                self.distance_matrix = None
+                self.distances = LazyDistances(data["node_coord"], cache_size)
+            case _:
+                raise ValueError(f"backend de distância desconhecido: {distance_backend}")
+        self.vertex_demand = data["demand"]
+        self.truck_capacity = data["capacity"]
+        self.V = data["node_coord"]
+        self.depot_i = data["depot"]
+        self.name = data["name"]
+        if data.get("optimal_value") is not None:
+            self.optimal_value = data["optimal_value"]
+        
+        # lista dos k vizinhos mais próximos (somente clientes) de cada vértice
+        self.neighbors_k = max(1, min(neighbors_k, len(self.V) - 2))
+        self.__neighbors = None
+        if data.get("neighbors") is not None and data["neighbors"].shape[1] == self.neighbors_k:
+            self.__neighbors = data["neighbors"]
+        elif self.distance_matrix is not None:
+            # com a matriz pronta o kNN sai barato; no backend "lazy" é O(n²) e só é
+            # calculado no primeiro uso (perturbações granulares, busca local, savings)
+            self.__neighbors = self.distances.nearest_neighbors(self.neighbors_k, exclude=self.depot_i)
+        self.seed()
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        """
+        Matriz n x neighbors_k com os vizinhos mais próximos de cada vértice (calculada no primeiro uso)
+        """
+        if self.__neighbors is None:
+            self.__neighbors = self.distances.nearest_neighbors(self.neighbors_k, exclude=self.depot_i)
+        return self.__neighbors
+
+    @property
+    def neighbors_built(self) -> bool:
+        """
+        Se a lista de vizinhos já existe (acessar neighbors não vai calculá-la)
+        """
+        return self.__neighbors is not None
         
+    def seed(self, seed: int | None = None):
+        """Reinicia os geradores aleatórios da instância. Cada execução do otimizador
+        chama com a própria semente, então execuções com a mesma semente fazem
+        exatamente as mesmas perturbações
+
+        Args:
+            seed (int | None, optional): semente (None usa entropia do sistema). Defaults to None.
+        """
+        self.rng = random.Random(seed)
+        # gerador do numpy para sortear os lotes de candidatos
+        self.batch_rng = np.random.default_rng(seed)
         
-    def __generate_distance_matrix(self, instance_dict: dict):
+    @classmethod
+    def build_distance_matrix(cls, node_coord: np.ndarray, matrix_dtype: str = "float64") -> np.ndarray:
         """
         Calcula a matrix de distancias euclidiana de todos os vértices para todos
+        de forma vetorizada (broadcasting), em blocos de linhas para limitar a memória
+
+        Args:
+            node_coord (np.ndarray): coordenadas dos vértices
+            matrix_dtype (str, optional): tipo da matriz. Defaults to "float64".
+
+        Returns:
+            np.ndarray: matriz de distâncias (inteiros arredondados)
+        """
+        coords = np.asarray(node_coord, dtype=float)
+        n = len(coords)
+        if matrix_dtype == "compact":
+            # maior distância possível é a diagonal da caixa que contém os pontos
+            max_dist = np.ceil(np.hypot(*np.ptp(coords, axis=0)))
+            matrix_dtype = "int16" if max_dist <= np.iinfo(np.int16).max else "int32"
+        elif np.issubdtype(np.dtype(matrix_dtype), np.integer):
+            max_dist = np.ceil(np.hypot(*np.ptp(coords, axis=0)))
+            if max_dist > np.iinfo(matrix_dtype).max:
+                raise ValueError(f"distâncias de até {max_dist} não cabem em {matrix_dtype}")
+        temp_array = np.empty(shape=(n, n), dtype=matrix_dtype) # matriz quadrada
+        for start in range(0, n, cls.matrix_chunk_size):
+            stop = min(start + cls.matrix_chunk_size, n)
+            # distâncias de um bloco de linhas contra todos os vértices
+            diff = coords[start:stop, np.newaxis, :] - coords[np.newaxis, :, :]
+            temp_array[start:stop] = rounded_euclidean(diff)
+        return temp_array #salva as distâncias em inteiro            
+    
+    
+    def route_cost(self, route: list[int]) -> int:
+        """Calcula o custo de uma única rota
+
+        Args:
+            route (list[int]): rota (começa e termina no depósito)
+
+        Returns:
+            int: valor do custo da rota
         """
-        shape = (instance_dict["dimension"], instance_dict["dimension"]) # matriz quadrada
-        temp_array = np.zeros(shape=shape, dtype=float)
-        for v in enumerate(instance_dict["node_coord"]):    # v[0] -> indice  e  v[1] -> vetor(x,y)
-            for u in enumerate(instance_dict["node_coord"]):
-                # norma de dois vetores que é equivalente a distância euclididiana
-                # usei a norma pois é mais rápido por conta do calculo com vetores
-                # ||v - u|| -> sqrt( sum((x_i - y_i)^2)) )
-                temp_array[v[0]][u[0]] = round(np.linalg.norm(v[1] - u[1])) 
-        self.distance_matrix = temp_array #salva as distâncias em inteiro            
+        # soma vetorizada das arestas (route[k], route[k+1])
+        return self.distances.path_cost(route)
+    
+    
+    def calculate_route_costs(self, solution: list[list[int]]) -> list[int]:
+        """Calcula o custo de cada rota da solução, usado como cache
+        para a avaliação incremental das perturbações
+
+        Args:
+            solution (list[list[int]]): solução
+
+        Returns:
+            list[int]: custo de cada rota (mesma ordem da solução)
+        """
+        return [self.route_cost(route) for route in solution]
     
     
     def calculate_cost(self, solution: list[list[int]]) -> int:
@@ -74,19 +262,19 @@ class CVRP:
         Returns:
             int: valor do custo
         """
-        cost = 0.0
-        # array de vertices
-        for route in solution:
-            # para todos os vertices da rota (route) pega a distancia dele com o próximo (route[1:])
-            cost += round(np.sum(self.distance_matrix[a][b] for a, b in zip(route, route[1:])))
-        return cost 
+        return sum(self.calculate_route_costs(solution))
     
     
-    def gen_initial_sol(self) -> list[list[int]]:
+    def gen_initial_sol(self, max_time: float = np.inf) -> list[list[int]]:
         """
         Cria uma solução inicial alatóriamente
         inserindo vertices até atingir a capacidade maxima
+
+        Args:
+            max_time (float, optional): tempo máximo tentando, depois levanta
+                RuntimeError. Defaults to np.inf.
         """
+        deadline = time.time() + max_time
         # verifica se a rota é válida
         while True:
             # Pega todos os indices dos vertices para ir criando as rotas
@@ -97,7 +285,7 @@ class CVRP:
                 route = []
                 while len(vertex_list):
                     # pega um elemento aleatóriamente
-                    u = random.choice(vertex_list)
+                    u = self.rng.choice(vertex_list)
                     # remove ele da lista
                     vertex_list.remove(u)
                     demand = self.vertex_demand[u] 
@@ -132,6 +320,8 @@ class CVRP:
 
             if self.verifica_solucao(initial_sol):
                 return initial_sol        
+            if time.time() > deadline:
+                raise RuntimeError(f"nenhuma solução inicial aleatória válida em {max_time}s")
     
     def verifica_solucao(self, sol: list[list[int]]) -> bool:
         """Verifica se uma solução é valida
@@ -168,31 +358,159 @@ class CVRP:
             # todos os vertices nas rota
             return False
     
-    def generate_new_solution(self, solution: list[list[int]]) -> list[list[int]]:
-        """Gera uma nova solução utilizando uma de três possiveis perturbações
-        aleatóriamente escolhida (SWAP, TWO-WAY SWAP, 2-opt)
+    def is_feasible(self, solution: Solution, route_indices) -> bool:
+        """Verifica a viabilidade somente das rotas alteradas olhando a carga em cache
 
         Args:
-            solution (list[list[int]]): solução
+            solution (Solution): solução
+            route_indices (Iterable[int]): índices das rotas alteradas
+
+        Returns:
+            bool: se todas as rotas alteradas respeitam a capacidade
+        """
+        return all(solution.loads[r] <= self.truck_capacity for r in route_indices)
+    
+    def __granular_move(self, solution: Solution, move: int) -> int | None:
+        """Aplica na solução (in place) uma perturbação restrita aos vizinhos mais
+        próximos: escolhe um cliente u e um vizinho v da lista de u e cria a aresta (u, v)
+        - 0: INSERTION, move u para depois de v (mesma rota)
+        - 1: SWAP, troca u com o sucessor de v (rotas diferentes)
+        - 2: 2-OPT, reverte o trecho entre u e v (mesma rota)
+
+        Args:
+            solution (Solution): solução que será alterada
+            move (int): perturbação
 
         Returns:
-            list[list[int]]: nova solução encontrada
+            int | None: variação de custo ou None se o par não serve para a perturbação
+                (nesse caso a solução não é alterada)
         """
-        new_solution = [route.copy() for route in solution]
-        match random.randint(0, 3): # Escolhe 1 de três operações possíveis
+        tour, pos = solution.tour, solution.pos
+        dist = self.distances.dist
+        u = self.rng.randint(1, len(self.V) - 1)
+        v = int(self.rng.choice(self.neighbors[u]))
+        ru, rv = solution.route_of[u], solution.route_of[v]
+        match move:
+            case 0:
+                if ru != rv:
+                    return None
+                i, j = pos[u], pos[v]
+                prev_u, next_u = tour[i-1], tour[i+1]
+                if prev_u == v:
+                    return None # u já está depois de v
+                next_v = tour[j+1]
+                # remove u ligando seus vizinhos na rota e insere entre v e seu sucessor
+                route_delta = round(dist(prev_u, next_u) - dist(prev_u, u) - dist(u, next_u)
+                                    + dist(v, u) + dist(u, next_v) - dist(v, next_v))
+                if j < i:
+                    # trecho [j+1..i] vira [u, tour[j+1..i-1]]
+                    solution.write(j + 1, [u] + tour[j+1:i].tolist(), ru)
+                else:
+                    # trecho [i..j] vira [tour[i+1..j], u]
+                    solution.write(i, tour[i+1:j+1].tolist() + [u], ru)
+                solution.set_cost(ru, solution.costs[ru] + route_delta)
+                return route_delta
+            case 1:
+                if ru == rv:
+                    return None
+                i, j = pos[u], pos[v]
+                # troca u com o sucessor de v (ou antecessor se o sucessor for o depósito)
+                k = j + 1 if tour[j+1] != self.depot_i else j - 1
+                if tour[k] == self.depot_i:
+                    k = j # rota de v só tem v, troca u com o próprio v
+                x = tour[k]
+                profile = self.profile
+                if profile is not None:
+                    feasibility_start = time.perf_counter()
+                load_diff = int(self.vertex_demand[x] - self.vertex_demand[u])
+                overloaded = (solution.loads[ru] + load_diff > self.truck_capacity or
+                              solution.loads[rv] - load_diff > self.truck_capacity)
+                if profile is not None:
+                    profile["feasibility"] += time.perf_counter() - feasibility_start
+                if overloaded:
+                    self.rejection = "capacity"
+                    return None
+                delta_u = round(dist(tour[i-1], x) + dist(x, tour[i+1])
+                                - dist(tour[i-1], u) - dist(u, tour[i+1]))
+                delta_v = round(dist(tour[k-1], u) + dist(u, tour[k+1])
+                                - dist(tour[k-1], x) - dist(x, tour[k+1]))
+                solution.write(i, (x,), ru)
+                solution.write(k, (u,), rv)
+                solution.set_load(ru, solution.loads[ru] + load_diff)
+                solution.set_load(rv, solution.loads[rv] - load_diff)
+                solution.set_cost(ru, solution.costs[ru] + delta_u)
+                solution.set_cost(rv, solution.costs[rv] + delta_v)
+                return delta_u + delta_v
+            case 2:
+                if ru != rv:
+                    return None
+                i, j = sorted((pos[u], pos[v]))
+                if j == i + 1:
+                    return None # já são adjacentes
+                # reverte tour[i+1..j] criando as arestas (tour[i], tour[j]) e (tour[i+1], tour[j+1])
+                a, b, c, e = tour[i], tour[i+1], tour[j], tour[j+1]
+                route_delta = round(dist(a, c) + dist(b, e) - dist(a, b) - dist(c, e))
+                solution.write(i + 1, tour[i+1:j+1][::-1], ru)
+                solution.set_cost(ru, solution.costs[ru] + route_delta)
+                return route_delta
+    
+    def generate_new_solution(self, solution: Solution, granular: bool = False,
+                              move_weights: list[float] | None = None, move: int | None = None) -> int:
+        """Aplica na solução (in place, sem cópia) uma de quatro possiveis perturbações
+        aleatóriamente escolhida (MULTIPLE INSERTION, TWO-WAY SWAP, 2-opt, GULOSO).
+        O custo da nova solução não é recalculado por inteiro: cada perturbação
+        devolve a variação de custo calculada somente com as arestas/rotas alteradas
+        e o custo em cache das rotas. Da mesma forma a viabilidade é verificada
+        somente pela carga em cache das rotas alteradas.
+        Quem chama decide se aceita (solution.commit()) ou rejeita (solution.undo())
+        a nova solução. Perturbações inviáveis já são desfeitas aqui e devolvem 0,
+        com o motivo em self.rejection.
+
+        Args:
+            solution (Solution): solução (alterada no lugar)
+            granular (bool, optional): se True as perturbações de inserção, troca e 2-opt
+                só propõem pares de vértices vizinhos (lista de vizinhos mais próximos). Defaults to False.
+            move_weights (list[float] | None, optional): peso de sorteio de cada perturbação
+                (na ordem de MOVES). Defaults to None (sorteio uniforme).
+            move (int | None, optional): índice em MOVES da perturbação, quando quem chama
+                já escolheu (seleção adaptativa). Defaults to None (sorteio).
+
+        Returns:
+            int: variação de custo (delta) da nova solução em relação à anterior
+        """
+        tour = solution.tour
+        n_routes = solution.number_of_routes
+        delta = 0
+        # rotas alteradas que precisam ter o custo recalculado
+        touched_routes = set()
+        self.rejection = None
+        profile = self.profile
+        if move is None and move_weights is None:
+            move = self.rng.randint(0, 3) # Escolhe 1 de quatro operações possíveis
+        elif move is None:
+            move = self.rng.choices(range(len(MOVES)), move_weights)[0]
+        match move:
+            case (0 | 1 | 2) as move if granular:
+                # perturbações restritas aos vizinhos mais próximos
+                granular_delta = self.__granular_move(solution, move)
+                if granular_delta is None:
+                    # par que não serve para a perturbação (a menos que tenha estourado a capacidade)
+                    self.rejection = self.rejection or "no_move"
+                    return 0
+                delta += granular_delta
             case 0:
                 # Random Multiple Insertion 
                 # realiza de 1 até n (aleatório até o n° de rotas)
-                for _ in range(random.randint(1, len(new_solution))):
+                for _ in range(self.rng.randint(1, n_routes)):
                     # escolhe 1 rota
-                    route_idx = random.choice(range(len(new_solution)))
-                    route = new_solution[route_idx]
+                    route_idx = self.rng.choice(range(n_routes))
+                    route = solution.route(route_idx)
 
                     # seleciona quantos elementos serão trocados (de 1 até len-2)
-                    num_elements = random.randint(1, len(route)-2)
+                    num_elements = self.rng.randint(1, len(route)-2)
 
                     # escolhe aleatoriamente os índices dos elementos na rota1 (sem incluir primeiro e último)
-                    selected_indices = sorted(random.sample(range(1, len(route) - 1), num_elements), reverse=True)
+                    selected_indices = sorted(self.rng.sample(range(1, len(route) - 1), num_elements), reverse=True)
                     selected_elements = [route[i] for i in selected_indices]
 
                     # remove os elementos selecionados da rota1
@@ -200,59 +518,93 @@ class CVRP:
                         del route[i]
 
                     # escolhe uma posição aleatória para inserir os elementos na rota (sem incluir primeiro e último)
-                    insert_position = random.randint(1, len(route) - 1)
+                    insert_position = self.rng.randint(1, len(route) - 1)
                     route[insert_position:insert_position] = selected_elements
+                    solution.write(solution.offsets[route_idx] + 1, route[1:-1], route_idx)
+                    touched_routes.add(route_idx)
             case 1:
                 # TWO-WAY SWAP entre rotas
                 # verifica se tem ao menos 2 rotas com pelo menos 3 elementos
-                valid_routes = [i for i in range(len(new_solution)) if len(new_solution[i]) > 2]
+                valid_routes = [i for i in range(n_routes) if solution.route_len(i) > 2]
                 if len(valid_routes) < 2:
-                    return new_solution  # Não a rotas suficientes
+                    self.rejection = "no_move"
+                    return 0  # Não a rotas suficientes
 
                 # escolhe 2 aleatorias
-                route1_idx, route2_idx = random.sample(valid_routes, 2)
-                route1, route2 = new_solution[route1_idx], new_solution[route2_idx]
+                route1_idx, route2_idx = self.rng.sample(valid_routes, 2)
+                len1, len2 = solution.route_len(route1_idx), solution.route_len(route2_idx)
+                start1, start2 = solution.offsets[route1_idx], solution.offsets[route2_idx]
 
                 # acha o numero max de elementos que podem ser trocados
-                max_swap = min(len(route1) - 2, len(route2) - 2)
+                max_swap = min(len1 - 2, len2 - 2)
                 if max_swap == 0: # rota só possui os depositos
-                    return new_solution 
+                    self.rejection = "no_move"
+                    return 0
 
                 # seleciona o n° de elementos 
-                num_elements = random.randint(1, max_swap)
+                num_elements = self.rng.randint(1, max_swap)
 
                 # seleciona os indices dos elementos a serem trocados, ignorando depositos
-                selected_indices1 = sorted(random.sample(range(1, len(route1) - 1), num_elements))
-                selected_indices2 = sorted(random.sample(range(1, len(route2) - 1), num_elements))
+                selected_indices1 = sorted(self.rng.sample(range(1, len1 - 1), num_elements))
+                selected_indices2 = sorted(self.rng.sample(range(1, len2 - 1), num_elements))
 
-                # troca elementos entre as rotas
+                # troca elementos entre as rotas atualizando carga e índice de rota
+                load_diff = 0
                 for i, j in zip(selected_indices1, selected_indices2):
-                    route1[i], route2[j] = route2[j], route1[i]
+                    u, v = tour[start1 + i], tour[start2 + j]
+                    solution.write(start1 + i, (v,), route1_idx)
+                    solution.write(start2 + j, (u,), route2_idx)
+                    load_diff += int(self.vertex_demand[v] - self.vertex_demand[u])
+                solution.set_load(route1_idx, solution.loads[route1_idx] + load_diff)
+                solution.set_load(route2_idx, solution.loads[route2_idx] - load_diff)
+                # somente a troca entre rotas altera a carga
+                if profile is not None:
+                    feasibility_start = time.perf_counter()
+                feasible = self.is_feasible(solution, (route1_idx, route2_idx))
+                if profile is not None:
+                    profile["feasibility"] += time.perf_counter() - feasibility_start
+                if not feasible:
+                    solution.undo()
+                    self.rejection = "capacity"
+                    return 0
+                touched_routes.update((route1_idx, route2_idx))
             case 2:
                 # 2-OPT
                 # escolhe rotas validas para essa operação
-                valid_routes = [i for i in range(len(new_solution)) if len(new_solution[i]) > 3]
+                valid_routes = [i for i in range(n_routes) if solution.route_len(i) > 3]
                 if not valid_routes:
-                    return new_solution  # não existem rotas validas
+                    self.rejection = "no_move"
+                    return 0  # não existem rotas validas
 
                 # rota aleatoria escolhida
-                route = new_solution[random.choice(valid_routes)]
+                route_idx = self.rng.choice(valid_routes)
+                start = solution.offsets[route_idx]
 
                 # escolher 2 indices aleatórios (mantendo 1 ≤ i < j ≤ len(route)-2)
-                i, j = sorted(random.sample(range(1, len(route) - 1), 2))
+                i, j = sorted(self.rng.sample(range(1, solution.route_len(route_idx) - 1), 2))
+                i, j = start + i, start + j
+
+                # somente as arestas (i-1, i) e (j, j+1) mudam, as internas
+                # são as mesmas percorridas ao contrário (distância simétrica)
+                dist = self.distances.dist
+                a, b, c, e = tour[i-1], tour[i], tour[j], tour[j+1]
+                route_delta = round(dist(a, c) + dist(b, e) - dist(a, b) - dist(c, e))
 
                 # reverte a ordem entre i and j
-                route[i:j+1] = reversed(route[i:j+1])
+                solution.write(i, tour[i:j+1][::-1], route_idx)
+                solution.set_cost(route_idx, solution.costs[route_idx] + route_delta)
+                delta += route_delta
             case 3:
                 # Algoritmo GULOSO
                 # escolhe uma rota e vai pegando os menores caminhos de forma gulosa 
                 # criando uma rota provavelmente menos custosa
-                valid_routes = [i for i in range(len(new_solution)) if len(new_solution[i]) > 3]
+                valid_routes = [i for i in range(n_routes) if solution.route_len(i) > 3]
                 if not valid_routes:
-                    return new_solution  # não existem rotas validas
+                    self.rejection = "no_move"
+                    return 0  # não existem rotas validas
                 
-                route_idx = random.sample(valid_routes, 1)[0]
-                route = new_solution[route_idx]
+                route_idx = self.rng.sample(valid_routes, 1)[0]
+                route = solution.route(route_idx)
                 
                 new_route = [0] #inclui o deposio
                 v_i = route[0] # deposito
@@ -260,13 +612,123 @@ class CVRP:
                 while True:
                     if len(non_visited) == 0: # acabou
                         break
-                    distance_for_all = np.array([self.distance_matrix[v_i][u_i] for u_i in (non_visited)]) # faz a distância
+                    distance_for_all = self.distances.dists_from(v_i, non_visited) # faz a distância
                     min_path_i = int(distance_for_all.argmin()) # acha o minimo
                     new_route.append(non_visited[min_path_i]) # adiciona o menor pra rota
                     v_i = non_visited[min_path_i]
                     non_visited.remove(v_i)
                 new_route.append(0) # adiciona deposito
-                new_solution[route_idx] = new_route    
-        if self.verifica_solucao(new_solution): 
-            return new_solution
-        else: return solution
\ No newline at end of file
+                solution.write(solution.offsets[route_idx] + 1, new_route[1:-1], route_idx)
+                touched_routes.add(route_idx)
+        # recalcula somente as rotas alteradas, as demais usam o custo em cache
+        if profile is not None:
+            cost_start = time.perf_counter()
+        for route_idx in touched_routes:
+            route_cost = self.route_cost(solution.route(route_idx))
+            delta += route_cost - solution.costs[route_idx]
+            solution.set_cost(route_idx, route_cost)
+        if profile is not None:
+            profile["cost"] += time.perf_counter() - cost_start
+        if self.debug:
+            # validação completa somente para depuração
+            assert self.verifica_solucao(solution.to_list()), "perturbação gerou solução inválida"
+        return delta
+    
+    def __select_candidate(self, deltas: np.ndarray, select: str, temp: float) -> int | None:
+        """Escolhe um candidato do lote
+
+        Args:
+            deltas (np.ndarray): variação de custo de cada candidato (inf se inviável)
+            select (str): "best" (menor delta) ou "metropolis" (sorteio com peso
+                exp(-delta/T), o que favorece os melhores sem sempre escolher o mesmo)
+            temp (float): temperatura atual
+
+        Returns:
+            int | None: índice do candidato ou None se nenhum é viável
+        """
+        best = int(deltas.argmin())
+        if not np.isfinite(deltas[best]):
+            return None
+        if select == "best" or temp <= 0.0:
+            return best
+        weights = np.exp(-(deltas - deltas[best]) / temp) # inf -> peso 0
+        return int(self.batch_rng.choice(len(deltas), p=weights / weights.sum()))
+    
+    def generate_batch_solution(self, solution: Solution, batch_size: int,
+                                select: str = "best", temp: float = 0.0) -> int:
+        """Sorteia um lote de batch_size candidatos de um mesmo tipo de perturbação,
+        avalia a variação de custo de todos de uma vez (expressão vetorizada do numpy)
+        e aplica na solução (in place, como generate_new_solution) o candidato escolhido.
+        Quando nenhum candidato é aplicado o motivo fica em self.rejection, como em
+        generate_new_solution. Não tem versão granular (ver SimulatedAnnealing)
+        - 2-OPT: pares (i, j) em uma rota aleatória
+        - SWAP: troca de um cliente entre um par de rotas aleatório (inviáveis descartados)
+
+        Args:
+            solution (Solution): solução (alterada no lugar)
+            batch_size (int): número de candidatos do lote
+            select (str, optional): "best" ou "metropolis". Defaults to "best".
+            temp (float, optional): temperatura atual (usada no "metropolis"). Defaults to 0.0.
+
+        Returns:
+            int: variação de custo (delta) da nova solução em relação à anterior
+        """
+        rng = self.batch_rng
+        pair_dists = self.distances.pair_dists
+        tour = np.frombuffer(solution.tour, dtype=np.int32)
+        n_routes = solution.number_of_routes
+        self.rejection = None
+        if self.rng.randint(0, 1) == 0:
+            # 2-OPT em lote
+            valid_routes = [r for r in range(n_routes) if solution.route_len(r) > 3]
+            if not valid_routes:
+                self.rejection = "no_move"
+                return 0
+            route_idx = self.rng.choice(valid_routes)
+            start, stop = solution.bounds(route_idx)
+            i = rng.integers(start + 1, stop - 1, batch_size)
+            j = rng.integers(start + 1, stop - 1, batch_size)
+            i, j = np.minimum(i, j), np.maximum(i, j)
+            a, b, c, e = tour[i - 1], tour[i], tour[j], tour[j + 1]
+            deltas = pair_dists(a, c) + pair_dists(b, e) - pair_dists(a, b) - pair_dists(c, e)
+            deltas = np.where(i < j, deltas, np.inf) # i == j não altera a rota
+            k = self.__select_candidate(deltas, select, temp)
+            if k is None:
+                self.rejection = "no_move"
+                return 0
+            route_delta = round(deltas[k])
+            lo, hi = int(i[k]), int(j[k])
+            solution.write(lo, solution.tour[lo:hi + 1][::-1], route_idx)
+            solution.set_cost(route_idx, solution.costs[route_idx] + route_delta)
+            return route_delta
+        # SWAP em lote entre um par de rotas
+        valid_routes = [r for r in range(n_routes) if solution.route_len(r) > 2]
+        if len(valid_routes) < 2:
+            self.rejection = "no_move"
+            return 0
+        route1_idx, route2_idx = self.rng.sample(valid_routes, 2)
+        start1, stop1 = solution.bounds(route1_idx)
+        start2, stop2 = solution.bounds(route2_idx)
+        i = rng.integers(start1 + 1, stop1 - 1, batch_size)
+        j = rng.integers(start2 + 1, stop2 - 1, batch_size)
+        u, v = tour[i], tour[j]
+        load_diff = self.vertex_demand[v] - self.vertex_demand[u]
+        feasible = ((solution.loads[route1_idx] + load_diff <= self.truck_capacity) &
+                    (solution.loads[route2_idx] - load_diff <= self.truck_capacity))
+        delta1 = (pair_dists(tour[i - 1], v) + pair_dists(v, tour[i + 1])
+                  - pair_dists(tour[i - 1], u) - pair_dists(u, tour[i + 1]))
+        delta2 = (pair_dists(tour[j - 1], u) + pair_dists(u, tour[j + 1])
+                  - pair_dists(tour[j - 1], v) - pair_dists(v, tour[j + 1]))
+        k = self.__select_candidate(np.where(feasible, delta1 + delta2, np.inf), select, temp)
+        if k is None:
+            # todos os candidatos do lote estouram a capacidade
+            self.rejection = "capacity"
+            return 0
+        u_k, v_k, diff_k = int(u[k]), int(v[k]), int(load_diff[k])
+        solution.write(int(i[k]), (v_k,), route1_idx)
+        solution.write(int(j[k]), (u_k,), route2_idx)
+        solution.set_load(route1_idx, solution.loads[route1_idx] + diff_k)
+        solution.set_load(route2_idx, solution.loads[route2_idx] - diff_k)
+        solution.set_cost(route1_idx, solution.costs[route1_idx] + round(delta1[k]))
+        solution.set_cost(route2_idx, solution.costs[route2_idx] + round(delta2[k]))
+        return round(delta1[k]) + round(delta2[k])
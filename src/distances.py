@@ -0,0 +1,237 @@
+from functools import lru_cache
+import numpy as np
+
+# memória temporária (bytes) de cada bloco de linhas do kNN calculado pelas coordenadas
+NEIGHBORS_MEMORY_BUDGET = 64 << 20
+
+
+def rounded_euclidean(diff: np.ndarray) -> np.ndarray:
+    """Distância euclidiana arredondada (TSPLIB EUC_2D) a partir das diferenças de coordenadas
+
+    Args:
+        diff (np.ndarray): diferenças (..., 2) entre pares de vértices
+
+    Returns:
+        np.ndarray: distâncias arredondadas para o inteiro mais próximo
+    """
+    # ||v - u|| -> sqrt( sum((x_i - y_i)^2)) )
+    return np.rint(np.sqrt(np.einsum("...k,...k->...", diff, diff)))
+
+
+def _nearest_in_rows(rows: np.ndarray, first_row: int, k: int, exclude: int) -> np.ndarray:
+    """Índices dos k vértices mais próximos para um bloco de linhas de distância
+
+    Args:
+        rows (np.ndarray): bloco de linhas da matriz de distâncias (cópia, é alterado)
+        first_row (int): índice do vértice da primeira linha do bloco
+        k (int): número de vizinhos
+        exclude (int): vértice que não pode ser vizinho (depósito)
+
+    Returns:
+        np.ndarray: vizinhos de cada linha ordenados pela distância
+    """
+    # o próprio vértice e o depósito não são vizinhos
+    rows[np.arange(len(rows)), np.arange(first_row, first_row + len(rows))] = np.inf
+    rows[:, exclude] = np.inf
+    part = np.argpartition(rows, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(rows, part, axis=1).argsort(axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _widen(values: np.ndarray) -> np.ndarray:
+    # distâncias de matrizes int16/int32 ("compact") viram int64: quem chama soma e subtrai
+    # os resultados vetorizados, e em int16 a soma estoura a partir de 32767
+    if np.issubdtype(values.dtype, np.integer) and values.dtype.itemsize < 8:
+        return values.astype(np.int64)
+    return values
+
+
+class DenseDistances:
+    """
+    Distâncias guardadas em uma matriz n x n já calculada
+    """
+    matrix: np.ndarray
+
+    def __init__(self, matrix: np.ndarray):
+        """
+        Args:
+            matrix (np.ndarray): matriz de distâncias
+        """
+        self.matrix = matrix
+
+    def dist(self, i: int, j: int) -> int | float:
+        """Distância entre dois vértices
+
+        Args:
+            i (int): vértice de origem
+            j (int): vértice de destino
+
+        Returns:
+            int | float: distância
+        """
+        # item() devolve int/float do Python (evita overflow com int16)
+        return self.matrix.item(i, j)
+
+    def dists_from(self, i: int, js: list[int]) -> np.ndarray:
+        """Distâncias de um vértice para vários outros
+
+        Args:
+            i (int): vértice de origem
+            js (list[int]): vértices de destino
+
+        Returns:
+            np.ndarray: distância para cada vértice de destino (int64 se a matriz for inteira)
+        """
+        return _widen(self.matrix[i, js])
+
+    def pair_dists(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Distâncias de vários pares (i[k], j[k]) de uma vez
+
+        Args:
+            i (np.ndarray): vértices de origem
+            j (np.ndarray): vértices de destino
+
+        Returns:
+            np.ndarray: distância de cada par (int64 se a matriz for inteira)
+        """
+        return _widen(self.matrix[i, j])
+
+    def path_cost(self, route: list[int]) -> int:
+        """Custo de percorrer a rota na ordem
+
+        Args:
+            route (list[int]): rota
+
+        Returns:
+            int: soma das distâncias das arestas (route[k], route[k+1])
+        """
+        return round(self.matrix[route[:-1], route[1:]].sum())
+
+    def nearest_neighbors(self, k: int, exclude: int = 0, chunk_size: int = 512) -> np.ndarray:
+        """Lista dos k vizinhos mais próximos de cada vértice
+
+        Args:
+            k (int): número de vizinhos
+            exclude (int, optional): vértice que não entra nas listas (depósito). Defaults to 0.
+            chunk_size (int, optional): linhas processadas por vez. Defaults to 512.
+
+        Returns:
+            np.ndarray: matriz n x k com os vizinhos ordenados pela distância
+        """
+        n = len(self.matrix)
+        neighbors = np.empty((n, k), dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            rows = self.matrix[start:start + chunk_size].astype(float)
+            neighbors[start:start + chunk_size] = _nearest_in_rows(rows, start, k, exclude)
+        return neighbors
+
+
+class LazyDistances:
+    """
+    Distâncias calculadas sob demanda a partir das coordenadas, com um cache
+    LRU limitado dos pares mais usados. Usa memória fixa, independente de n,
+    permitindo resolver instâncias onde a matriz n x n não cabe na memória.
+    """
+    coords: np.ndarray
+    cache_size: int
+
+    def __init__(self, coords: np.ndarray, cache_size: int = 1 << 20):
+        """
+        Args:
+            coords (np.ndarray): coordenadas (x, y) de cada vértice
+            cache_size (int, optional): número máximo de pares no cache. Defaults to 2**20.
+        """
+        self.coords = np.asarray(coords, dtype=float)
+        self.cache_size = cache_size
+        # cache por instância (e não na classe) para poder liberar junto com ela
+        self.__cached_dist = lru_cache(maxsize=cache_size)(self.__compute_dist)
+
+    def __getstate__(self) -> dict:
+        # o cache não é serializado (processos filhos criados por spawn começam vazios)
+        return {"coords": self.coords, "cache_size": self.cache_size}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["coords"], state["cache_size"])
+
+    def __compute_dist(self, i: int, j: int) -> int:
+        return int(rounded_euclidean(self.coords[i] - self.coords[j]))
+
+    def dist(self, i: int, j: int) -> int:
+        """Distância entre dois vértices (usa o cache LRU)
+
+        Args:
+            i (int): vértice de origem
+            j (int): vértice de destino
+
+        Returns:
+            int: distância
+        """
+        # distância simétrica, normaliza o par para aproveitar o cache
+        if i > j:
+            i, j = j, i
+        return self.__cached_dist(i, j)
+
+    def dists_from(self, i: int, js: list[int]) -> np.ndarray:
+        """Distâncias de um vértice para vários outros (calculadas vetorizadas, sem cache)
+
+        Args:
+            i (int): vértice de origem
+            js (list[int]): vértices de destino
+
+        Returns:
+            np.ndarray: distância para cada vértice de destino
+        """
+        return rounded_euclidean(self.coords[js] - self.coords[i])
+
+    def pair_dists(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Distâncias de vários pares (i[k], j[k]) de uma vez (calculadas vetorizadas, sem cache)
+
+        Args:
+            i (np.ndarray): vértices de origem
+            j (np.ndarray): vértices de destino
+
+        Returns:
+            np.ndarray: distância de cada par
+        """
+        return rounded_euclidean(self.coords[i] - self.coords[j])
+
+    def path_cost(self, route: list[int]) -> int:
+        """Custo de percorrer a rota na ordem (calculado vetorizado, sem cache)
+
+        Args:
+            route (list[int]): rota
+
+        Returns:
+            int: soma das distâncias das arestas (route[k], route[k+1])
+        """
+        points = self.coords[route]
+        return round(rounded_euclidean(points[1:] - points[:-1]).sum())
+
+    def nearest_neighbors(self, k: int, exclude: int = 0, memory_budget: int = NEIGHBORS_MEMORY_BUDGET) -> np.ndarray:
+        """Lista dos k vizinhos mais próximos de cada vértice, calculada
+        em blocos de linhas a partir das coordenadas (sem a matriz completa)
+
+        Args:
+            k (int): número de vizinhos
+            exclude (int, optional): vértice que não entra nas listas (depósito). Defaults to 0.
+            memory_budget (int, optional): bytes de temporários por bloco, o número de linhas
+                do bloco sai dele. Defaults to NEIGHBORS_MEMORY_BUDGET.
+
+        Returns:
+            np.ndarray: matriz n x k com os vizinhos ordenados pela distância
+        """
+        n = len(self.coords)
+        # por linha: diferenças (2 float64), distâncias e seus intermediários (2 float64)
+        # e o argpartition (int64), 48 bytes por coluna
+        chunk_size = max(1, memory_budget // (48 * n))
+        neighbors = np.empty((n, k), dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            diff = self.coords[start:start + chunk_size, np.newaxis, :] - self.coords[np.newaxis, :, :]
+            neighbors[start:start + chunk_size] = _nearest_in_rows(rounded_euclidean(diff), start, k, exclude)
+        return neighbors
+
+    def cache_info(self):
+        """
+        Estatísticas do cache LRU (acertos, falhas, tamanho)
+        """
+        return self.__cached_dist.cache_info()
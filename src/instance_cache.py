@@ -0,0 +1,106 @@
+"""
+Cache binário das instâncias: o .vrp é lido uma vez e os dados (coordenadas,
+demandas, capacidade, metadados), a matriz de distâncias e a lista de vizinhos
+são gravados em arquivos .npy. As próximas cargas usam np.load(mmap_mode='r'),
+então execuções repetidas e processos do pool começam na hora e compartilham
+as páginas da matriz pelo cache de páginas do sistema operacional.
+
+Layout: <cache_dir>/<nome do arquivo>-<chave>/ com meta.json, node_coord.npy,
+demand.npy, distance_matrix-<dtype>.npy e neighbors-<k>.npy. A chave é um hash do
+path absoluto, da data de modificação e do tamanho do .vrp, então alterar o
+arquivo invalida o cache.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from atomic_file import atomic_write
+
+
+def entry_dir(instance_path: str, cache_dir: str) -> str:
+    """Pasta do cache para a versão atual do arquivo
+
+    Args:
+        instance_path (str): path do arquivo .vrp
+        cache_dir (str): pasta raiz do cache
+
+    Returns:
+        str: pasta da entrada no cache
+    """
+    path = os.path.abspath(instance_path)
+    stat = os.stat(path)
+    key = hashlib.sha1(f"{path}|{stat.st_mtime_ns}|{stat.st_size}".encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{key}")
+
+
+def load(instance_path: str, cache_dir: str, matrix_dtype: str | None, neighbors_k: int) -> dict | None:
+    """Carrega a instância do cache (arrays em memory map somente leitura)
+
+    Args:
+        instance_path (str): path do arquivo .vrp
+        cache_dir (str): pasta raiz do cache
+        matrix_dtype (str | None): tipo da matriz pedida (None se não precisa da matriz)
+        neighbors_k (int): tamanho da lista de vizinhos pedida
+
+    Returns:
+        dict | None: dados no formato de CVRP.read_instance (com "distance_matrix" e
+            "neighbors" quando já estão no cache) ou None se a instância não está no cache
+    """
+    entry = entry_dir(instance_path, cache_dir)
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        data = json.load(f)
+    data["node_coord"] = np.load(os.path.join(entry, "node_coord.npy"), mmap_mode="r")
+    data["demand"] = np.load(os.path.join(entry, "demand.npy"), mmap_mode="r")
+    optional = {"neighbors": f"neighbors-{neighbors_k}.npy"}
+    if matrix_dtype is not None:
+        optional["distance_matrix"] = f"distance_matrix-{matrix_dtype}.npy"
+    for key, file_name in optional.items():
+        path = os.path.join(entry, file_name)
+        if os.path.exists(path):
+            data[key] = np.load(path, mmap_mode="r")
+    return data
+
+
+def store(instance_path: str, cache_dir: str, instance, matrix_dtype: str, neighbors_k: int):
+    """Grava no cache o que ainda não está lá (dados, matriz e vizinhos da instância)
+
+    Args:
+        instance_path (str): path do arquivo .vrp
+        cache_dir (str): pasta raiz do cache
+        instance (CVRP): instância já carregada
+        matrix_dtype (str): tipo da matriz pedido na criação da instância
+        neighbors_k (int): tamanho da lista de vizinhos pedido na criação da instância
+    """
+    entry = entry_dir(instance_path, cache_dir)
+    os.makedirs(entry, exist_ok=True)
+    arrays = {
+        "node_coord.npy": instance.V,
+        "demand.npy": instance.vertex_demand,
+        }
+    if instance.neighbors_built:
+        # no backend "lazy" os vizinhos só existem depois do primeiro uso
+        arrays[f"neighbors-{neighbors_k}.npy"] = instance.neighbors
+    if instance.distance_matrix is not None:
+        arrays[f"distance_matrix-{matrix_dtype}.npy"] = instance.distance_matrix
+    for file_name, array in arrays.items():
+        path = os.path.join(entry, file_name)
+        if not os.path.exists(path):
+            # leitores de outros processos nunca veem um .npy pela metade
+            with atomic_write(path) as f:
+                np.save(f, np.asarray(array))
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.exists(meta_path):
+        # meta.json por último: marca a entrada como completa
+        meta = {
+            "name": instance.name,
+            "number_of_trucks": instance.number_of_trucks,
+            "optimal_value": getattr(instance, "optimal_value", None),
+            "capacity": int(instance.truck_capacity),
+            "depot": instance.depot_i,
+            }
+        with atomic_write(meta_path, "w") as f:
+            json.dump(meta, f)
@@ -0,0 +1,151 @@
+"""
+Instrumentação do laço do Simulated Annealing com custo baixo: por iteração só
+são incrementados contadores (aceitações por faixa de temperatura, motivos de
+rejeição); o tempo de cada fase (perturbação, custo, viabilidade, aceitação)
+é medido somente em uma a cada sample_every iterações e extrapolado, e um
+snapshot do estado é guardado a cada snapshot_interval segundos.
+"""
+import json
+import math
+
+
+class Instrumentation:
+    """
+    Contadores e snapshots de uma execução, exportáveis em JSON
+    """
+    sample_every: int
+    snapshot_interval: float
+
+    def __init__(self, sample_every: int = 64, snapshot_interval: float = 1.0):
+        """
+        Args:
+            sample_every (int, optional): iterações entre as medições de tempo das fases. Defaults to 64.
+            snapshot_interval (float, optional): segundos entre os snapshots. Defaults to 1.0.
+        """
+        self.sample_every = sample_every
+        self.snapshot_interval = snapshot_interval
+        self.iterations = 0
+        self.accepted = 0
+        self.improved = 0
+        # capacity: troca estourou a capacidade; no_move: não havia rota/par válido;
+        # zero_delta: perturbação sem variação de custo; metropolis: piora recusada
+        self.rejections = {"capacity": 0, "no_move": 0, "zero_delta": 0, "metropolis": 0}
+        # faixa de temperatura (potência de 10) -> [tentativas, aceitações]
+        self.temp_bands: dict[str, list[int]] = {}
+        # tempo medido nas iterações amostradas (CVRP.profile aponta para este dict)
+        self.phase_times = {"move": 0.0, "cost": 0.0, "feasibility": 0.0, "acceptance": 0.0}
+        self.sampled_iterations = 0
+        self.snapshots: list[dict] = []
+        self.best_over_time: list[tuple[float, int]] = []
+        self.__last_temp = None
+        self.__band = None
+        self.__next_snapshot = 0.0
+        self.__last_snapshot = (0.0, 0)
+
+    def sampling(self, iteration: int) -> bool:
+        """
+        Se a iteração deve ter as fases cronometradas
+        """
+        return iteration % self.sample_every == 0
+
+    def record(self, temp: float, cost_diff: int, accepted: bool, rejection: str | None):
+        """Registra o resultado de uma iteração
+
+        Args:
+            temp (float): temperatura da iteração
+            cost_diff (int): variação de custo proposta
+            accepted (bool): se a nova solução foi aceita
+            rejection (str | None): motivo da rejeição (chave de rejections) ou None
+        """
+        self.iterations += 1
+        if temp != self.__last_temp:
+            # a temperatura só muda quando uma piora é aceita, a faixa fica em cache
+            self.__last_temp = temp
+            self.__band = f"1e{math.floor(math.log10(temp))}" if temp > 0 else "0"
+        band = self.temp_bands.get(self.__band)
+        if band is None:
+            band = self.temp_bands[self.__band] = [0, 0]
+        band[0] += 1
+        if accepted:
+            self.accepted += 1
+            band[1] += 1
+            if cost_diff < 0:
+                self.improved += 1
+        elif rejection is not None:
+            self.rejections[rejection] += 1
+
+    def record_best(self, time_diff: float, best_cost: int):
+        """
+        Registra uma nova melhor solução (tempo, custo)
+        """
+        self.best_over_time.append((time_diff, best_cost))
+
+    def snapshot_due(self, time_diff: float) -> bool:
+        """
+        Se já passou snapshot_interval desde o último snapshot
+        """
+        return time_diff >= self.__next_snapshot
+
+    def snapshot(self, time_diff: float, iteration: int, temp: float, current_cost: int, best_cost: int):
+        """Guarda o estado atual e a taxa de iterações desde o último snapshot
+
+        Args:
+            time_diff (float): tempo desde o início
+            iteration (int): número da iteração
+            temp (float): temperatura atual
+            current_cost (int): custo da solução atual
+            best_cost (int): custo da melhor solução
+        """
+        last_time, last_iteration = self.__last_snapshot
+        elapsed = time_diff - last_time
+        self.snapshots.append({
+            "time": time_diff,
+            "iteration": iteration,
+            "temp": temp,
+            "current_cost": current_cost,
+            "best_cost": best_cost,
+            "iterations_per_second": (iteration - last_iteration) / elapsed if elapsed > 0 else 0.0,
+            })
+        self.__last_snapshot = (time_diff, iteration)
+        self.__next_snapshot = time_diff + self.snapshot_interval
+
+    def to_dict(self, total_time: float) -> dict:
+        """Resumo da execução
+
+        Args:
+            total_time (float): tempo total da execução
+
+        Returns:
+            dict: contadores, tempo estimado de cada fase (extrapolado das iterações
+                amostradas), taxas de aceitação por faixa de temperatura e snapshots
+        """
+        scale = self.iterations / self.sampled_iterations if self.sampled_iterations else 0.0
+        phases = {phase: t * scale for phase, t in self.phase_times.items()}
+        # "move" é medido em volta de toda a perturbação, que inclui custo e viabilidade
+        phases["move"] -= phases["cost"] + phases["feasibility"]
+        return {
+            "iterations": self.iterations,
+            "total_time": total_time,
+            "iterations_per_second": self.iterations / total_time if total_time > 0 else 0.0,
+            "accepted": self.accepted,
+            "improved": self.improved,
+            "rejections": dict(self.rejections),
+            "phase_time_estimate": phases,
+            "sampled_iterations": self.sampled_iterations,
+            "acceptance_by_temp_band": {
+                band: {"tries": tries, "accepts": accepts, "rate": accepts / tries}
+                for band, (tries, accepts) in self.temp_bands.items()
+                },
+            "best_over_time": self.best_over_time,
+            "snapshots": self.snapshots,
+            }
+
+    def export(self, path: str, total_time: float):
+        """Grava o resumo em JSON
+
+        Args:
+            path (str): arquivo de saída
+            total_time (float): tempo total da execução
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(total_time), f, indent=1)
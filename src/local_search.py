@@ -0,0 +1,262 @@
+"""
+Busca local determinística para intensificar a melhor solução do Simulated
+Annealing: 2-opt e Or-opt dentro da rota, relocate, swap e 2-opt* entre rotas.
+Cada vértice u só testa movimentos que criam uma aresta entre u e um vizinho v
+da sua lista de vizinhos mais próximos, aplica a primeira melhoria encontrada
+e usa don't-look bits: um vértice só volta a ser examinado quando alguma aresta
+ligada a ele muda. A capacidade dos caminhões é respeitada e nenhuma rota fica
+vazia, então o número de rotas (number_of_trucks) se mantém.
+"""
+from collections import deque
+from cvrp import CVRP
+
+
+class LocalSearch:
+    """
+    Busca local de primeira melhoria sobre as rotas em listas
+    """
+    max_segment: int
+
+    def __init__(self, instance: CVRP, max_segment: int = 3):
+        """
+        Args:
+            instance (CVRP): instância do CVRP
+            max_segment (int, optional): tamanho máximo dos trechos movidos pelo Or-opt. Defaults to 3.
+        """
+        self.instance = instance
+        self.max_segment = max_segment
+        self.dist = instance.distances.dist
+        self.demand = [int(d) for d in instance.vertex_demand]
+        self.capacity = int(instance.truck_capacity)
+        self.depot = instance.depot_i
+        self.neighbors = [[int(v) for v in row] for row in instance.neighbors]
+
+    def run(self, routes: list[list[int]]) -> tuple[list[list[int]], int]:
+        """Aplica movimentos de melhoria até nenhum vértice ter movimento que melhore
+
+        Args:
+            routes (list[list[int]]): rotas (com os depósitos), não são alteradas
+
+        Returns:
+            tuple[list[list[int]], int]: rotas melhoradas e a redução total de custo
+        """
+        self.routes = [list(route) for route in routes]
+        n = len(self.demand)
+        self.route_of = [-1] * n
+        self.pos = [-1] * n
+        self.loads = [0] * len(self.routes)
+        for r in range(len(self.routes)):
+            self.__update_route(r)
+        customers = [v for v in range(n) if v != self.depot]
+        # don't-look bits: somente os vértices na fila são examinados
+        queue = deque(customers)
+        active = [False] * n
+        for v in customers:
+            active[v] = True
+        gain = 0
+        while queue:
+            u = queue.popleft()
+            active[u] = False
+            result = self.__improve(u)
+            if result is None:
+                continue
+            delta, touched = result
+            gain -= delta
+            for w in touched:
+                if w != self.depot and not active[w]:
+                    active[w] = True
+                    queue.append(w)
+        return self.routes, round(gain)
+
+    def __update_route(self, r: int):
+        """
+        Recalcula posição, rota e carga dos vértices da rota r
+        """
+        route = self.routes[r]
+        for i in range(1, len(route) - 1):
+            self.route_of[route[i]] = r
+            self.pos[route[i]] = i
+        self.loads[r] = sum(self.demand[v] for v in route[1:-1])
+
+    def __improve(self, u: int) -> tuple[float, set[int]] | None:
+        """Procura o primeiro movimento que melhora criando a aresta (u, v) para
+        algum vizinho v de u e o aplica
+
+        Args:
+            u (int): cliente examinado
+
+        Returns:
+            tuple[float, set[int]] | None: variação de custo e vértices com arestas
+                alteradas, ou None se nenhum movimento melhora
+        """
+        for v in self.neighbors[u]:
+            if v == self.depot:
+                continue
+            if self.route_of[u] == self.route_of[v]:
+                result = self.__two_opt(u, v)
+                for length in range(1, self.max_segment + 1):
+                    if result is not None:
+                        break
+                    result = self.__move_segment(u, v, length, after=True) or self.__move_segment(u, v, length, after=False)
+            else:
+                result = (self.__move_segment(u, v, 1, after=True) or self.__move_segment(u, v, 1, after=False)
+                          or self.__swap(u, v) or self.__two_opt_star(u, v))
+            if result is not None:
+                return result
+        return None
+
+    def __two_opt(self, u: int, v: int) -> tuple[float, set[int]] | None:
+        """
+        2-opt dentro da rota: reverte o trecho entre u e v criando a aresta (u, v)
+        """
+        dist = self.dist
+        r = self.route_of[u]
+        route = self.routes[r]
+        i, j = sorted((self.pos[u], self.pos[v]))
+        x, y = route[i], route[j]
+        # reverte route[i+1..j]: (x, route[i+1]) e (y, route[j+1]) viram (x, y) e (route[i+1], route[j+1])
+        if j > i + 1:
+            delta = dist(x, y) + dist(route[i+1], route[j+1]) - dist(x, route[i+1]) - dist(y, route[j+1])
+            if delta < 0:
+                # pontas antes de reverter (route[i+1] vai para a posição j)
+                touched = {x, y, route[i+1], route[j+1]}
+                route[i+1:j+1] = route[i+1:j+1][::-1]
+                self.__update_route(r)
+                return delta, touched
+        # reverte route[i..j-1]: (route[i-1], x) e (route[j-1], y) viram (route[i-1], route[j-1]) e (x, y)
+        if j - 1 > i:
+            delta = dist(x, y) + dist(route[i-1], route[j-1]) - dist(route[i-1], x) - dist(route[j-1], y)
+            if delta < 0:
+                # pontas antes de reverter (route[j-1] vai para a posição i)
+                touched = {x, y, route[i-1], route[j-1]}
+                route[i:j] = route[i:j][::-1]
+                self.__update_route(r)
+                return delta, touched
+        return None
+
+    def __move_segment(self, u: int, v: int, length: int, after: bool) -> tuple[float, set[int]] | None:
+        """Or-opt (mesma rota) ou relocate (outra rota): move o trecho de length
+        clientes que começa em u para junto de v, criando a aresta (u, v)
+
+        Args:
+            u (int): primeiro cliente do trecho
+            v (int): vizinho de u
+            length (int): número de clientes do trecho
+            after (bool): insere depois de v (trecho na ordem) ou antes (trecho invertido)
+
+        Returns:
+            tuple[float, set[int]] | None: variação de custo e vértices alterados ou None
+        """
+        dist = self.dist
+        ru, rv = self.route_of[u], self.route_of[v]
+        src = self.routes[ru]
+        p = self.pos[u]
+        if p + length > len(src) - 1:
+            return None # o trecho passaria do depósito final
+        segment = src[p:p+length]
+        if v in segment:
+            return None
+        prev_s, next_s = src[p-1], src[p+length]
+        if ru == rv and v in (prev_s, next_s):
+            return None # já adjacente ao trecho, coberto pelo 2-opt
+        if ru != rv:
+            segment_load = sum(self.demand[w] for w in segment)
+            if self.loads[rv] + segment_load > self.capacity or len(src) - 2 == length:
+                return None # estoura a capacidade ou esvaziaria a rota
+        dst = self.routes[rv]
+        q = self.pos[v]
+        last = segment[-1]
+        removal = dist(prev_s, u) + dist(last, next_s) - dist(prev_s, next_s)
+        if after:
+            a, b = v, dst[q+1]
+            insertion = dist(a, u) + dist(last, b) - dist(a, b)
+        else:
+            a, b = dst[q-1], v
+            insertion = dist(a, last) + dist(u, b) - dist(a, b)
+        delta = insertion - removal
+        if delta >= 0:
+            return None
+        del src[p:p+length]
+        q = dst.index(v)
+        if after:
+            dst[q+1:q+1] = segment
+        else:
+            dst[q:q] = segment[::-1]
+        self.__update_route(ru)
+        if rv != ru:
+            self.__update_route(rv)
+        return delta, {prev_s, next_s, a, b, u, last}
+
+    def __swap(self, u: int, v: int) -> tuple[float, set[int]] | None:
+        """
+        Swap entre rotas: troca u com o sucessor (ou antecessor) de v, que fica ao lado de v
+        """
+        dist = self.dist
+        ru, rv = self.route_of[u], self.route_of[v]
+        route_u, route_v = self.routes[ru], self.routes[rv]
+        i, q = self.pos[u], self.pos[v]
+        for k in (q + 1, q - 1):
+            x = route_v[k]
+            if x == self.depot:
+                continue
+            load_diff = self.demand[x] - self.demand[u]
+            if self.loads[ru] + load_diff > self.capacity or self.loads[rv] - load_diff > self.capacity:
+                continue
+            pu, su = route_u[i-1], route_u[i+1]
+            px, sx = route_v[k-1], route_v[k+1]
+            delta = (dist(pu, x) + dist(x, su) + dist(px, u) + dist(u, sx)
+                     - dist(pu, u) - dist(u, su) - dist(px, x) - dist(x, sx))
+            if delta < 0:
+                route_u[i], route_v[k] = x, u
+                self.__update_route(ru)
+                self.__update_route(rv)
+                return delta, {pu, su, px, sx, u, x}
+        return None
+
+    def __two_opt_star(self, u: int, v: int) -> tuple[float, set[int]] | None:
+        """
+        2-opt* entre rotas: recombina os começos e os finais das duas rotas criando a aresta (u, v)
+        """
+        dist = self.dist
+        ru, rv = self.route_of[u], self.route_of[v]
+        route_u, route_v = self.routes[ru], self.routes[rv]
+        p, q = self.pos[u], self.pos[v]
+        su, pv, sv = route_u[p+1], route_v[q-1], route_v[q+1]
+        head_u = sum(self.demand[w] for w in route_u[1:p+1])
+        head_v = sum(self.demand[w] for w in route_v[1:q])
+        # início de u + final de v desde v | início de v até pv + final de u desde su
+        new_u, new_v = head_u + self.loads[rv] - head_v, head_v + self.loads[ru] - head_u
+        if (new_u <= self.capacity and new_v <= self.capacity and (q > 1 or su != self.depot)):
+            delta = dist(u, v) + dist(pv, su) - dist(u, su) - dist(pv, v)
+            if delta < 0:
+                self.routes[ru] = route_u[:p+1] + route_v[q:]
+                self.routes[rv] = route_v[:q] + route_u[p+1:]
+                self.__update_route(ru)
+                self.__update_route(rv)
+                return delta, {u, v, pv, su}
+        # início de u + início de v invertido | final de u invertido + final de v depois de v
+        head_v += self.demand[v]
+        new_u, new_v = head_u + head_v, self.loads[ru] - head_u + self.loads[rv] - head_v
+        if (new_u <= self.capacity and new_v <= self.capacity
+                and (su != self.depot or sv != self.depot)):
+            delta = dist(u, v) + dist(su, sv) - dist(u, su) - dist(v, sv)
+            if delta < 0:
+                self.routes[ru] = route_u[:p+1] + route_v[:q+1][::-1]
+                self.routes[rv] = route_u[p+1:][::-1] + route_v[q+1:]
+                self.__update_route(ru)
+                self.__update_route(rv)
+                return delta, {u, v, su, sv}
+        return None
+
+
+def local_search(instance: CVRP, routes: list[list[int]]) -> list[list[int]]:
+    """Aplica a busca local nas rotas
+
+    Args:
+        instance (CVRP): instância do CVRP
+        routes (list[list[int]]): rotas (com os depósitos)
+
+    Returns:
+        list[list[int]]: rotas localmente ótimas para os movimentos da LocalSearch
+    """
+    return LocalSearch(instance).run(routes)[0]
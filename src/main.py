@@ -1,91 +1,101 @@
-from simulated_annealing import SimulatedAnnealing
-from cvrp import CVRP
-import pandas as pd
-from tqdm import tqdm
-from multiprocessing import Pool
-import matplotlib.pyplot as plt
-import numpy as np
+"""
+Linha de comando do Simulated Annealing para o CVRP:
+
+    python src/main.py solve instances/A/A-n32-k5.vrp --time-limit 10
+    python src/main.py batch --root ./instances --folders A B F --processes 8
+    python src/main.py tune --min-time 5 --max-time 300
+    python src/main.py chart --instance A-n32-k5.vrp
+    python src/main.py report all_instances_run.jsonl
+
+As bibliotecas pesadas (numpy, vrplib, tqdm, pandas, matplotlib, numba) só são
+importadas dentro dos subcomandos que as usam: um solve curto não paga o
+import de pandas e matplotlib. A forma antiga
+`python src/main.py <path_raiz> <path_pasta> <path_instancia> <limite_de_tempo>`
+continua funcionando.
+"""
+import argparse
 import os
+import sys
+
+# parâmetros calibrados usados por padrão
+DEFAULT_PARAMS = {"initial_temp": 100, "cooling_func": "log", "cooling_rate": 0.5555}
+COMMANDS = ("solve", "batch", "tune", "chart", "report")
 
 def search_best_parameters(
         root: str = "./instances",
-        instance_paths: list[str] = ["A/A-n32-k5", "A/A-n46-k7", "A/A-n80-k10","B/B-n50-k8", "B/B-n78-k10"]
-    ):
-    """Procura os melhores parâmetros
+        instance_paths: list[str] = ["A/A-n32-k5", "A/A-n46-k7", "A/A-n80-k10","B/B-n50-k8", "B/B-n78-k10"],
+        cache_dir: str | None = None,
+        results_path: str = "best_params_search_results_updated.jsonl",
+        processes: int = os.cpu_count(),
+        min_time: float = 5.0,
+        max_time: float = 300.0
+    ) -> dict:
+    """Procura os melhores parâmetros por successive halving em paralelo (ver tuning):
+    configurações ruins são descartadas com execuções curtas e só as melhores chegam
+    a max_time. As execuções são gravadas em results_path e uma busca interrompida
+    continua de onde parou
 
     Args:
         root (str, optional): raiz dos arquivos. Defaults to "./instances".
         instance_paths (list[str], optional): arquivos de instância. 
             Defaults to ["A/A-n32-k5", "A/A-n46-k7", "A/A-n80-k10","B/B-n50-k8", "B/B-n78-k10"].
+        cache_dir (str | None, optional): pasta do cache binário das instâncias. Defaults to None.
+        results_path (str, optional): arquivo .jsonl dos resultados.
+            Defaults to "best_params_search_results_updated.jsonl".
+        processes (int, optional): quantidade de processos. Defaults to os.cpu_count().
+        min_time (float, optional): limite de tempo da primeira rodada. Defaults to 5.0.
+        max_time (float, optional): limite de tempo da última rodada. Defaults to 300.0.
+
+    Returns:
+        dict: melhores parâmetros e o resumo de cada rodada (ver tuning.successive_halving)
     """
-    param_temps_initial = [100, 1000, 5000]
-    params_cooling_func = ["exp", "lin", "log"]
-    params_cooling_rate = [0.5555, 0.7777, 0.9999]
-    df = pd.DataFrame()
-    for instance in tqdm(instance_paths):
-        for init_temp in param_temps_initial:
-            for cooling_func in params_cooling_func:
-                for cooling_rate in params_cooling_rate:
-                    instance_obj = CVRP(os.path.join(root, instance + '.vrp'))
-                    sa = SimulatedAnnealing(
-                        initial_temp=init_temp,
-                        cooling_func=cooling_func,
-                        cooling_rate=cooling_rate,
-                        time_limit=300
-                        )
-                    print(f"instance: {instance}, initial_temp: {init_temp}," 
-                          f"cooling_func:{cooling_func}, cooling_rate:{cooling_rate}")
-                    sa.optimize(instance_obj)
-                    report = sa.return_report()
-                    df = pd.concat([df, pd.DataFrame(
-                        {
-                            "name":instance,
-                            "optimal_cost:":instance_obj.optimal_value,
-                            "initial_temp":init_temp,
-                            "cooling_func": cooling_func,
-                            "cooling_rate": cooling_rate,
-                            **report,
-                        }
-                        )],
-                        ignore_index=True)
-        print(df)
-    df.to_csv("best_params_search_results_updated.csv", index=False)   
+    import tuning
+    result = tuning.successive_halving(
+        [os.path.join(root, instance + '.vrp') for instance in instance_paths],
+        min_time=min_time,
+        max_time=max_time,
+        processes=processes,
+        results_path=results_path,
+        cache_dir=cache_dir,
+        )
+    print(f"melhores parâmetros: {result['best_params']}")
+    return result
     
-def run_all_instances_serial(root: str = "./instances", instance_folders = ["A","B","F"]):
-    """Roda todas as instâncias do problema de forma serial
+def run_all_instances_serial(root: str = "./instances", instance_folders = ["A","B","F"],
+                             results_path: str = "all_instances_run.jsonl"):
+    """Roda todas as instâncias do problema de forma serial. Cada execução é gravada
+    em results_path ao terminar e as que já estão no arquivo (mesma instância, parâmetros,
+    limite de tempo e repetição, ver RUN_KEY_FIELDS) são puladas (retomada)
 
     Args:
         root (str, optional): raiz dos arquivos. Defaults to "./instances".
         instance_folders (list, optional): pasta das instâncias. Defaults to ["A","B","F"].
+        results_path (str, optional): arquivo .jsonl dos resultados. Defaults to "all_instances_run.jsonl".
     """
-    df = pd.DataFrame()
-    for folder in instance_folders:
-        for instance in tqdm(list(filter(lambda x: True if x.endswith(".vrp") else False,
-                               os.listdir(os.path.join(root, folder)))),
-                             desc=f"Rodando instâncias de {folder}"):
-            instance_obj = CVRP(os.path.join(root, folder, instance))
-            for i in range(5):
-                sa = SimulatedAnnealing(
-                    initial_temp=100,
-                    cooling_func="log",
-                    cooling_rate=0.5555,
-                    time_limit=300.0
-                    )
-                sa.optimize(instance_obj)
-                report = sa.return_report()
-                df = pd.concat([df, pd.DataFrame(
-                            {
-                                "name":instance,
-                                "instance_no": i,
-                                "optimal_cost:":instance_obj.optimal_value,
-                                **report,
-                            }
-                            )],
-                        ignore_index=True
-                    )
-            df.to_csv("all_instances_run.csv", index=False)
+    from tqdm import tqdm
+    from cvrp import CVRP
+    from simulated_annealing import SimulatedAnnealing
+    from results_sink import RUN_KEY_FIELDS, ResultsSink, params_key, run_record
+    time_limit = 300.0
+    run_fields = {"time_limit": time_limit, **DEFAULT_PARAMS, "params_key": params_key(DEFAULT_PARAMS)}
+    with ResultsSink(results_path, key_fields=RUN_KEY_FIELDS) as sink:
+        done = sink.completed()
+        for folder in instance_folders:
+            for instance in tqdm(list(filter(lambda x: True if x.endswith(".vrp") else False,
+                                   os.listdir(os.path.join(root, folder)))),
+                                 desc=f"Rodando instâncias de {folder}"):
+                instance_obj = None
+                for i in range(5):
+                    if sink.key({"name": instance, "instance_no": i, **run_fields}) in done:
+                        continue
+                    if instance_obj is None:
+                        instance_obj = CVRP(os.path.join(root, folder, instance))
+                    sa = SimulatedAnnealing(**DEFAULT_PARAMS, time_limit=time_limit)
+                    sa.optimize(instance_obj)
+                    sink.write(run_record(sa.return_report(), name=instance, instance_no=i, **run_fields,
+                                           **{"optimal_cost:": instance_obj.optimal_value}))
         
-def process_instance(folder, instance, root="./instances", time_lim=300.0, range_ = 5):
+def process_instance(folder, instance, root="./instances", time_lim=300.0, range_ = 5, cache_dir=None):
     """Processa uma instância
 
     Args:
@@ -93,21 +103,19 @@ def process_instance(folder, instance, root="./instances", time_lim=300.0, range
         instance (str): nome do arquivo
         root (str, optional): raiz da pasta do arquivo. Defaults to "./instances".
         time_lim (float, optional): limite de tempo. Defaults to 300.0.
+        cache_dir (str, optional): pasta do cache binário das instâncias. Defaults to None.
 
     Returns:
-        _type_: _description_
+        list[dict]: report de cada repetição com "name", "instance_no" e "optimal_cost:"
     """
+    from cvrp import CVRP
+    from simulated_annealing import SimulatedAnnealing
     instance_path = os.path.join(root, folder, instance)
-    instance_obj = CVRP(instance_path)  
+    instance_obj = CVRP(instance_path, cache_dir=cache_dir)  
     reports = []
     for i in range(range_):
         print(instance, i)
-        sa = SimulatedAnnealing(
-            initial_temp=100,
-            cooling_func="log",
-            cooling_rate=0.5555,
-            time_limit=time_lim
-        )
+        sa = SimulatedAnnealing(**DEFAULT_PARAMS, time_limit=float(time_lim))
         sa.optimize(instance_obj)
         report = sa.return_report()
         # Add additional info
@@ -117,109 +125,244 @@ def process_instance(folder, instance, root="./instances", time_lim=300.0, range
         reports.append(report)
     return reports
 
-def run_instances_parallel(root="./instances", instance_folders=["A", "B", "F"], processes=4):
-    """Roda as instâncias em paralelo
+def run_instances_parallel(root="./instances", instance_folders=["A", "B", "F"], processes=4, cache_dir=None,
+                           results_path="all_instances_run.jsonl", range_=5, time_lim=300.0):
+    """Roda as instâncias em paralelo, uma execução (instância, repetição) por tarefa
+    do pool (ver scheduler). Cada resultado é gravado em results_path assim que
+    termina e as execuções que já estão no arquivo (mesma instância, parâmetros, limite
+    de tempo e repetição, ver RUN_KEY_FIELDS) são puladas (retomada)
 
     Args:
         root (str, optional): raiz dos arquivos. Defaults to "./instances".
         instance_folders (list, optional): pasta das instâncias. Defaults to ["A", "B", "F"].
         processes (int, optional): quantidade de processos. Defaults to 4.
+        cache_dir (str, optional): pasta do cache binário das instâncias. Cada instância é
+            lida uma vez e os processos usam a mesma cópia em memória compartilhada. Defaults to None.
+        results_path (str, optional): arquivo .jsonl dos resultados. Defaults to "all_instances_run.jsonl".
+        range_ (int, optional): repetições por instância. Defaults to 5.
+        time_lim (float, optional): limite de tempo de cada execução. Defaults to 300.0.
     """
-    tasks = []
+    import scheduler
+    from results_sink import RUN_KEY_FIELDS, ResultsSink
+    instance_paths = []
     for folder in instance_folders:
         folder_path = os.path.join(root, folder)
-        instance_files = [f for f in os.listdir(folder_path) if f.endswith(".vrp")]
-        for instance in instance_files:
-            tasks.append((folder, instance))
-    
-    all_reports = []
-
-    with Pool(processes=processes) as pool:
-        # Roda as instâncias e pega tos resultados
-        results_list = list(tqdm(pool.starmap(process_instance, tasks), total=len(tasks),
-                                 desc="Rodando Instâncias"))
+        instance_paths += [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith(".vrp")]
+    with ResultsSink(results_path, key_fields=RUN_KEY_FIELDS) as sink:
+        units = scheduler.make_units(instance_paths, range_, [DEFAULT_PARAMS], time_lim, sink=sink)
+        scheduler.run_units(units, sink, processes=processes, cache_dir=cache_dir, desc="Rodando Instâncias")
     
-    # Junta os resultados
-    for reports in results_list:
-        all_reports.extend(reports)
-    
-    df = pd.DataFrame(all_reports)
-    df.to_csv("all_instances_run.csv", index=False)
-    
-def gen_chart(root="./instances/A", instance="A-n32-k5.vrp"):
-    """Gera o gráfico de valor da função objetiva por iteração
+def gen_chart(root="./instances/A", instance="A-n32-k5.vrp", output="convergence.svg", trace_path=None,
+              time_lim=300.0):
+    """Gera o gráfico de valor da função objetiva por iteração. O otimizador guarda
+    só as novas melhores e uma amostra logarítmica das iterações (ConvergenceTrace),
+    então o gráfico já sai leve sem precisar reamostrar
 
     Args:
         root (str, optional): pasta da instância. Defaults to "./instances/A".
         instance (str, optional): nome da instância. Defaults to "A-n32-k5".
+        output (str, optional): arquivo do gráfico. Defaults to "convergence.svg".
+        trace_path (str, optional): se passado, também grava os pontos em .npy. Defaults to None.
+        time_lim (float, optional): limite de tempo da execução. Defaults to 300.0.
     """
+    import matplotlib.pyplot as plt
+    from cvrp import CVRP
+    from simulated_annealing import SimulatedAnnealing
     instance_obj = CVRP(os.path.join(root, instance))  
     
-    sa = SimulatedAnnealing(
-        initial_temp=100,
-        cooling_func="log",
-        cooling_rate=0.5555,
-        time_limit=300
-    )
+    sa = SimulatedAnnealing(**DEFAULT_PARAMS, time_limit=time_lim, trace_path=trace_path)
     chart_info = sa.optimize(instance_obj, gen_chart=True)
         
-        # Find max values
-    max_x = chart_info["iterations"][-1]
-    min_y = min(chart_info["f_obj_val"])
-    min_y_i = np.array(chart_info["f_obj_val"]).argmin()
+    # ponto de menor custo
+    min_i = chart_info["f_obj_val"].argmin()
+    min_x = int(chart_info["iterations"][min_i])
+    min_y = int(chart_info["f_obj_val"][min_i])
 
-    # Downsample Y-axis labels (show values only at each 1000)
-    plt.figure(figsize=[12,6])
-    plt.title("A-n32-k5 Custo por Iteração - Simulated Annealing")
-    plt.plot(chart_info["iterations"][::1000],chart_info["f_obj_val"][::1000], linestyle = "dashdot", color='g')
-    plt.axhline(y = instance_obj.optimal_value, color = 'r', linestyle = '--') 
-    plt.xlabel("Iterações")
-    plt.ylabel("Custo")
-    plt.tight_layout()
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.scatter([min_y_i], [min_y], color="r", zorder=3)
-    plt.text(min_y_i, min_y-50, f"({min_y_i}, {min_y})", fontsize=8, verticalalignment='bottom', horizontalalignment="center", color="blue")
-    plt.savefig("example_1000.svg")
-    plt.close()
-            
-    plt.figure(figsize=[12,6])
-    plt.title("A-n32-k5 Custo por Iteração - Simulated Annealing")
-    plt.plot(chart_info["iterations"][::10000],chart_info["f_obj_val"][::10000], linestyle = "dashdot", color='g')
-    plt.axhline(y = instance_obj.optimal_value, color = 'r', linestyle = '--') 
-    plt.xlabel("Iterações")
-    plt.ylabel("Custo")
-    plt.tight_layout()
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.scatter([min_y_i], [min_y], color="r", zorder=3)
-    plt.text(min_y_i, min_y-50, f"({min_y_i}, {min_y})", fontsize=8, verticalalignment='bottom', horizontalalignment="center", color="blue")
-    plt.savefig("example_10000.svg")       
-    plt.close()
-    
     plt.figure(figsize=[12,6])
-    plt.title("A-n32-k5 Custo por Iteração - Simulated Annealing")
+    plt.title(f"{instance_obj.name} Custo por Iteração - Simulated Annealing")
     plt.plot(chart_info["iterations"],chart_info["f_obj_val"], linestyle = "dashdot", color='g')
     plt.axhline(y = instance_obj.optimal_value, color = 'r', linestyle = '--') 
     plt.xlabel("Iterações")
     plt.ylabel("Custo")
     plt.tight_layout()
     plt.grid(True, linestyle="--", alpha=0.6)
-    plt.scatter([min_y_i], [min_y], color="r", zorder=3)
-    plt.text(min_y_i, min_y-50, f"({min_y_i}, {min_y})", fontsize=8, verticalalignment='bottom', horizontalalignment="center", color="blue")
-    plt.savefig("example_no_downsample.svg")         
+    plt.scatter([min_x], [min_y], color="r", zorder=3)
+    plt.text(min_x, min_y-50, f"({min_x}, {min_y})", fontsize=8, verticalalignment='bottom', horizontalalignment="center", color="blue")
+    plt.savefig(output)
+    plt.close()
             
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 5:
-        print("USO: python3 src/main.py <path_root> <path_pasta> <path_instancia> <limite_de_tempo>")
-    # search_best_parameters()
-    # run_all_instances()
-    # run_instances_parallel()
-    # gen_chart()
-    out = process_instance(root=sys.argv[1],folder=sys.argv[2], instance=sys.argv[3], time_lim=sys.argv[4], range_=1)[0]
-    for i, rota in enumerate(out["best_solution"][0]):
+def solve(args: argparse.Namespace) -> dict:
+    """Resolve uma instância (subcomando solve)
+
+    Args:
+        args (argparse.Namespace): argumentos da linha de comando
+
+    Returns:
+        dict: SimulatedAnnealing.return_report() (ou ParallelTempering.return_report() com --replicas)
+    """
+    from cvrp import CVRP
+    time_limit = args.time_limit
+    if time_limit is None:
+        # só com --iterations a execução é determinística (sem limite de tempo)
+        time_limit = 0.0 if args.iterations is not None else 300.0
+    instance = CVRP(args.instance, cache_dir=args.cache_dir)
+    if args.replicas > 1:
+        # parallel tempering: as réplicas só param pelo tempo e perturbam com o motor em Python
+        if time_limit <= 0:
+            raise ValueError("--replicas precisa de --time-limit")
+        ignored = [option for option, used in (("--iterations", args.iterations is not None),
+                                               ("--engine", args.engine != "python"),
+                                               ("--operator-selection", args.operator_selection != "uniform"),
+                                               ("--cooling-func", args.cooling_func != DEFAULT_PARAMS["cooling_func"]),
+                                               ("--cooling-rate", args.cooling_rate != DEFAULT_PARAMS["cooling_rate"]),
+                                               ("--local-search-every", args.local_search_every != 0),
+                                               ("--final-local-search", args.final_local_search)) if used]
+        if ignored:
+            raise ValueError(f"--replicas não pode ser combinado com {', '.join(ignored)}")
+        from parallel_tempering import ParallelTempering
+        pt = ParallelTempering(
+            replicas=args.replicas,
+            t_min=args.t_min,
+            t_max=args.initial_temp,
+            time_limit=time_limit,
+            granular=args.granular,
+            constructor=args.constructor,
+            seed=args.seed,
+            )
+        pt.optimize(instance)
+        return pt.return_report()
+    from simulated_annealing import SimulatedAnnealing
+    sa = SimulatedAnnealing(
+        initial_temp=args.initial_temp,
+        cooling_func=args.cooling_func,
+        cooling_rate=args.cooling_rate,
+        time_limit=time_limit,
+        iteration_limit=args.iterations if args.iterations is not None else float("inf"),
+        granular=args.granular,
+        engine=args.engine,
+        constructor=args.constructor,
+        operator_selection=args.operator_selection,
+        seed=args.seed,
+        local_search_every=args.local_search_every,
+        final_local_search=args.final_local_search,
+        )
+    sa.optimize(instance)
+    return sa.return_report()
+
+
+def print_report(report: dict):
+    """
+    Imprime as rotas, o custo e o tempo da melhor solução
+    """
+    for i, rota in enumerate(report["best_solution"][0]):
         print(f"# Rota {i}: {rota}")
-    print(f"Custo: {out["best_cost"]}")
-    print(f"Tmepo: {out["time_for_best_sol"]}")
-    
-    
\ No newline at end of file
+    print(f"Custo: {report['best_cost']}")
+    print(f"Tempo: {report['time_for_best_sol']}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Argumentos da linha de comando (um subparser por subcomando)
+    """
+    parser = argparse.ArgumentParser(description="Simulated Annealing para o CVRP")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve_parser = commands.add_parser("solve", help="resolve uma instância")
+    solve_parser.add_argument("instance", help="arquivo .vrp")
+    solve_parser.add_argument("--time-limit", type=float, default=None,
+                              help="segundos (padrão 300, ou sem limite de tempo com --iterations)")
+    solve_parser.add_argument("--iterations", type=int, default=None, help="limite de iterações")
+    solve_parser.add_argument("--seed", type=int, default=None)
+    solve_parser.add_argument("--initial-temp", type=float, default=DEFAULT_PARAMS["initial_temp"])
+    solve_parser.add_argument("--cooling-func", choices=["exp", "log", "lin"], default=DEFAULT_PARAMS["cooling_func"])
+    solve_parser.add_argument("--cooling-rate", type=float, default=DEFAULT_PARAMS["cooling_rate"])
+    solve_parser.add_argument("--engine", choices=["python", "numba"], default="python")
+    solve_parser.add_argument("--constructor", choices=["random", "savings", "sweep"], default="random")
+    solve_parser.add_argument("--granular", action="store_true")
+    solve_parser.add_argument("--operator-selection", choices=["uniform", "adaptive"], default="uniform")
+    solve_parser.add_argument("--local-search-every", type=int, default=0)
+    solve_parser.add_argument("--final-local-search", action="store_true")
+    solve_parser.add_argument("--replicas", type=int, default=1,
+                              help="réplicas do parallel tempering (1 = Simulated Annealing); --initial-temp "
+                                   "vira a maior temperatura da escala")
+    solve_parser.add_argument("--t-min", type=float, default=1.0, help="menor temperatura do parallel tempering")
+    solve_parser.add_argument("--cache-dir", default=None)
+    solve_parser.add_argument("--json", action="store_true", help="imprime o report em JSON")
+
+    batch_parser = commands.add_parser("batch", help="roda as instâncias das pastas em paralelo")
+    batch_parser.add_argument("--root", default="./instances")
+    batch_parser.add_argument("--folders", nargs="+", default=["A", "B", "F"])
+    batch_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    batch_parser.add_argument("--cache-dir", default=None)
+    batch_parser.add_argument("--results", default="all_instances_run.jsonl")
+    batch_parser.add_argument("--repetitions", type=int, default=5)
+    batch_parser.add_argument("--time-limit", type=float, default=300.0)
+
+    tune_parser = commands.add_parser("tune", help="calibra os parâmetros (successive halving)")
+    tune_parser.add_argument("--root", default="./instances")
+    tune_parser.add_argument("--instances", nargs="+",
+                             default=["A/A-n32-k5", "A/A-n46-k7", "A/A-n80-k10", "B/B-n50-k8", "B/B-n78-k10"])
+    tune_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    tune_parser.add_argument("--cache-dir", default=None)
+    tune_parser.add_argument("--results", default="best_params_search_results_updated.jsonl")
+    tune_parser.add_argument("--min-time", type=float, default=5.0)
+    tune_parser.add_argument("--max-time", type=float, default=300.0)
+
+    chart_parser = commands.add_parser("chart", help="gráfico da convergência de uma execução")
+    chart_parser.add_argument("--root", default="./instances/A")
+    chart_parser.add_argument("--instance", default="A-n32-k5.vrp")
+    chart_parser.add_argument("--output", default="convergence.svg")
+    chart_parser.add_argument("--trace", default=None, help="grava também os pontos em .npy")
+    chart_parser.add_argument("--time-limit", type=float, default=300.0)
+
+    report_parser = commands.add_parser("report", help="estatísticas dos resultados (ver report_analysis)")
+    report_parser.add_argument("results", nargs="+", help="arquivos .csv, .jsonl ou .parquet")
+    report_parser.add_argument("--by", choices=["instance", "params"], default="instance",
+                               help="uma linha por instância ou por combinação de parâmetros")
+    report_parser.add_argument("--params", nargs="+", default=None, help="colunas dos parâmetros (--by params)")
+    report_parser.add_argument("--output", default=None)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    """Ponto de entrada da linha de comando
+
+    Args:
+        argv (list[str] | None, optional): argumentos (sem o nome do programa). Defaults to sys.argv[1:].
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    if len(argv) == 4 and argv[0] not in COMMANDS:
+        # forma antiga: <path_raiz> <path_pasta> <path_instancia> <limite_de_tempo>
+        root, folder, instance, time_lim = argv
+        print_report(process_instance(root=root, folder=folder, instance=instance, time_lim=float(time_lim), range_=1)[0])
+        return
+    args = parser.parse_args(argv)
+    match args.command:
+        case "solve":
+            report = solve(args)
+            if args.json:
+                import json
+                print(json.dumps(report, default=lambda value: value.item()))
+            else:
+                print_report(report)
+        case "batch":
+            run_instances_parallel(args.root, args.folders, args.processes, args.cache_dir, args.results,
+                                   args.repetitions, args.time_limit)
+        case "tune":
+            search_best_parameters(args.root, args.instances, args.cache_dir, args.results, args.processes,
+                                   args.min_time, args.max_time)
+        case "chart":
+            gen_chart(args.root, args.instance, args.output, args.trace, args.time_limit)
+        case "report":
+            import report_analysis
+            if args.by == "instance":
+                report_analysis.gen_all_instances_report(args.results, args.output or "all_instances_report.csv")
+            else:
+                report_analysis.params_mean_calculate(args.results, args.params or report_analysis.PARAM_COLUMNS,
+                                                      args.output or "mean_report_params.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Seleção adaptativa das perturbações (roleta do ALNS): cada perturbação de
+cvrp.MOVES tem um peso de sorteio que, a cada segmento de iterações, se move em
+direção à melhoria de custo que ela produziu por segundo de CPU no segmento
+(medido com time.process_time, não com o relógio de parede).
+Perturbações caras e quase sempre rejeitadas perdem peso, sem nunca ficarem
+abaixo de um peso mínimo (continuam sendo testadas). No modo determinístico o
+esforço é medido em chamadas em vez de segundos, para a trajetória não depender
+do tempo medido.
+"""
+import random
+from cvrp import MOVES
+
+
+class AdaptiveOperatorSelection:
+    """
+    Pesos de sorteio e estatísticas de cada perturbação
+    """
+    weights: list[float]
+    segment: int
+    reaction: float
+    min_weight: float
+    effort: str
+
+    def __init__(self, rng: random.Random, segment: int = 100, reaction: float = 0.2,
+                 min_weight: float = 0.05, effort: str = "time"):
+        """
+        Args:
+            rng (random.Random): gerador da execução
+            segment (int, optional): iterações entre as atualizações dos pesos. Defaults to 100.
+            reaction (float, optional): fração do peso substituída pela nova medida a cada
+                atualização (0 não adapta, 1 esquece o histórico). Defaults to 0.2.
+            min_weight (float, optional): peso mínimo de cada perturbação (os pesos somam 1).
+                Defaults to 0.05.
+            effort (str, optional): "time" (melhoria por segundo de CPU) ou "count" (melhoria
+                por chamada, determinístico). Defaults to "time".
+        """
+        n_moves = len(MOVES)
+        self.rng = rng
+        self.effort = effort
+        self.weights = [1.0 / n_moves] * n_moves
+        self.segment = segment
+        self.reaction = reaction
+        self.min_weight = min_weight
+        # estatísticas acumuladas da execução
+        self.counts = [0] * n_moves
+        self.accepts = [0] * n_moves
+        self.improvements = [0] * n_moves
+        self.gain = [0] * n_moves
+        self.time = [0.0] * n_moves
+        # medidas do segmento atual
+        self.__iteration = 0
+        self.__segment_gain = [0] * n_moves
+        self.__segment_time = [0.0] * n_moves
+
+    def select(self) -> int:
+        """
+        Sorteia uma perturbação pela roleta dos pesos (índice em MOVES)
+        """
+        return self.rng.choices(range(len(self.weights)), self.weights)[0]
+
+    def update(self, move: int, delta: int, accepted: bool, elapsed: float):
+        """Registra o resultado de uma perturbação
+
+        Args:
+            move (int): índice em MOVES
+            delta (int): variação de custo proposta
+            accepted (bool): se a nova solução foi aceita
+            elapsed (float): tempo de CPU gasto na perturbação (segundos, time.process_time)
+        """
+        self.counts[move] += 1
+        self.time[move] += elapsed
+        self.__segment_time[move] += elapsed if self.effort == "time" else 1.0
+        if accepted:
+            self.accepts[move] += 1
+        if accepted and delta < 0:
+            self.improvements[move] += 1
+            self.gain[move] -= delta
+            self.__segment_gain[move] -= delta
+        self.__iteration += 1
+        if self.__iteration % self.segment == 0:
+            self.__update_weights()
+
+    def __update_weights(self):
+        """
+        Move os pesos em direção à melhoria por esforço de cada perturbação no segmento
+        """
+        rates = [gain / elapsed if elapsed > 0 else 0.0
+                 for gain, elapsed in zip(self.__segment_gain, self.__segment_time)]
+        total = sum(rates)
+        if total > 0:
+            for move, rate in enumerate(rates):
+                # perturbações não sorteadas no segmento mantêm o peso
+                if self.__segment_time[move] > 0:
+                    self.weights[move] = (1 - self.reaction) * self.weights[move] + self.reaction * rate / total
+            weights = [max(weight, self.min_weight) for weight in self.weights]
+            self.weights = [weight / sum(weights) for weight in weights]
+        self.__segment_gain = [0] * len(self.weights)
+        self.__segment_time = [0.0] * len(self.weights)
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Estatísticas por perturbação: sorteios, aceitações, melhorias, ganho total,
+        tempo gasto e peso final
+        """
+        return {
+            name: {
+                "count": self.counts[move],
+                "accepts": self.accepts[move],
+                "improvements": self.improvements[move],
+                "gain": self.gain[move],
+                "time": self.time[move],
+                "weight": self.weights[move],
+            }
+            for move, name in enumerate(MOVES)
+        }
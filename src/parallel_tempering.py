@@ -0,0 +1,189 @@
+import math
+import os
+import random
+import secrets
+from multiprocessing import Pipe, Process
+from time import time
+import numpy as np
+from cvrp import CVRP
+from solution import Solution
+from construction import build_initial_solution
+from shared_instance import SharedInstance, attach
+
+# iterações de uma época entre as consultas ao relógio
+DEADLINE_CHECK = 64
+
+
+def _replica_worker(conn, handle: dict, seed: int, granular: bool, constructor: str):
+    """Processo de uma réplica: mantém a própria solução e executa épocas
+    de Metropolis a temperatura fixa quando o processo principal pede. A época
+    termina antes das iterações pedidas se passar do prazo (time() absoluto)
+
+    Args:
+        conn (Connection): ponta do pipe com o processo principal
+        handle (dict): instância publicada em memória compartilhada (SharedInstance.handle)
+        seed (int): semente da réplica (derivada da semente da execução)
+        granular (bool): perturbações restritas aos vizinhos mais próximos
+        constructor (str): heurística da solução inicial (ver build_initial_solution)
+    """
+    instance = attach(handle)
+    instance.seed(seed)
+    rng = instance.rng
+    solution = Solution.from_routes(instance, build_initial_solution(instance, constructor))
+    cost = best_cost = solution.cost
+    conn.send((cost, best_cost, solution.to_list()))
+    while True:
+        command = conn.recv()
+        if command is None:
+            break
+        temp, n_iterations, deadline = command
+        best_solution = None
+        for iteration in range(n_iterations):
+            # o relógio é consultado a cada DEADLINE_CHECK iterações
+            if iteration % DEADLINE_CHECK == 0 and time() >= deadline:
+                break
+            cost_diff = instance.generate_new_solution(solution, granular)
+            if cost_diff < 0 or (cost_diff > 0 and temp > 0.0
+                                 and rng.random() <= math.exp(-cost_diff / temp)):
+                solution.commit()
+                cost += cost_diff
+                if cost < best_cost:
+                    best_cost = cost
+                    best_solution = solution.copy()
+            else:
+                solution.undo()
+        # só envia as rotas quando a réplica melhorou a própria melhor solução
+        conn.send((cost, best_cost, best_solution.to_list() if best_solution is not None else None))
+    conn.close()
+
+
+class ParallelTempering:
+    """
+    Parallel tempering (replica exchange) do Simulated Annealing: R réplicas
+    da mesma instância rodam em processos separados, cada uma a uma temperatura
+    fixa de uma escala geométrica. A cada época as réplicas de temperaturas
+    vizinhas trocam de temperatura (equivalente a trocar os estados) com a
+    probabilidade de Metropolis, permitindo usar todos os núcleos em uma única
+    instância dentro do mesmo time_limit.
+    """
+    temperatures: np.ndarray
+    best_solution: Solution
+    best_solution_cost: float
+    best_solution_time: float
+    start_time: float
+    finish_time: float
+    total_time_spent: float
+    # semente usada na última execução (a passada em seed ou uma sorteada)
+    run_seed: int
+
+    def __init__(self, replicas: int = os.cpu_count(), t_min: float = 1.0, t_max: float = 100.0,
+                 time_limit: float = 0.0, epoch_iterations: int = 2000, granular: bool = False,
+                 constructor: str = "random", seed: int | None = None):
+        """
+        Args:
+            replicas (int, optional): número de réplicas (processos). Defaults to os.cpu_count().
+            t_min (float, optional): menor temperatura da escala. Defaults to 1.0.
+            t_max (float, optional): maior temperatura da escala. Defaults to 100.0.
+            time_limit (float, optional): limite de tempo. Defaults to 0.0.
+            epoch_iterations (int, optional): iterações de cada réplica entre as trocas. Defaults to 2000.
+            granular (bool, optional): perturbações restritas aos vizinhos mais próximos. Defaults to False.
+            constructor (str, optional): heurística da solução inicial de cada réplica. Defaults to "random".
+            seed (int | None, optional): semente da execução, da qual saem as sementes das
+                réplicas (None sorteia uma nova a cada optimize). Defaults to None.
+        """
+        self.temperatures = np.geomspace(t_min, t_max, replicas)
+        self.time_limit = float(time_limit)
+        self.epoch_iterations = epoch_iterations
+        self.granular = granular
+        self.constructor = constructor
+        self.seed = seed
+
+    def optimize(self, instance: CVRP) -> None:
+        """Otimiza a instância com as réplicas em paralelo
+
+        Args:
+            instance (CVRP): instância do CVRP
+        """
+        self.start_time = time()
+        self.run_seed = self.seed if self.seed is not None else secrets.randbits(63)
+        self.rng = random.Random(self.run_seed)
+        replicas = len(self.temperatures)
+        # a matriz fica uma única vez na memória, compartilhada pelas réplicas
+        shared = SharedInstance(instance)
+        conns, processes = [], []
+        # temperature_of[r] -> índice na escala da temperatura da réplica r
+        temperature_of = list(range(replicas))
+        costs = [0] * replicas
+        self.best_solution_cost = math.inf
+        self.best_solution_time = 0.0
+        best_routes = None
+        try:
+            for replica in range(replicas):
+                parent_conn, child_conn = Pipe()
+                process = Process(target=_replica_worker,
+                                  args=(child_conn, shared.handle, self.rng.getrandbits(63), self.granular,
+                                        self.constructor),
+                                  daemon=True)
+                process.start()
+                conns.append(parent_conn)
+                processes.append(process)
+            for replica, conn in enumerate(conns):
+                costs[replica], best_cost, routes = conn.recv()
+                if best_cost < self.best_solution_cost:
+                    self.best_solution_cost, best_routes = best_cost, routes
+            deadline = self.start_time + self.time_limit
+            time_diff = time() - self.start_time
+            while time_diff < self.time_limit:
+                for replica, conn in enumerate(conns):
+                    conn.send((float(self.temperatures[temperature_of[replica]]), self.epoch_iterations, deadline))
+                for replica, conn in enumerate(conns):
+                    costs[replica], best_cost, routes = conn.recv()
+                    if routes is not None and best_cost < self.best_solution_cost:
+                        self.best_solution_cost, best_routes = best_cost, routes
+                        self.best_solution_time = time() - self.start_time
+                self.__exchange(temperature_of, costs)
+                time_diff = time() - self.start_time
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, EOFError, OSError):
+                    pass # réplica que já morreu; o erro original continua subindo
+            for process in processes:
+                process.join(timeout=5.0)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            shared.close()
+        self.best_solution = Solution.from_routes(instance, best_routes)
+        self.finish_time = time()
+        self.total_time_spent = self.finish_time - self.start_time
+
+    def __exchange(self, temperature_of: list[int], costs: list[int]):
+        """Tenta trocar as temperaturas de réplicas vizinhas na escala
+        (pares pares/ímpares alternados aleatoriamente)
+
+        Args:
+            temperature_of (list[int]): índice da temperatura de cada réplica (alterado no lugar)
+            costs (list[int]): custo atual de cada réplica
+        """
+        replica_at = {t: r for r, t in enumerate(temperature_of)}
+        for t in range(self.rng.randint(0, 1), len(self.temperatures) - 1, 2):
+            r1, r2 = replica_at[t], replica_at[t + 1]
+            beta_diff = 1.0 / self.temperatures[t] - 1.0 / self.temperatures[t + 1]
+            # critério de Metropolis da troca: min(1, exp((E1 - E2) * (1/T1 - 1/T2)))
+            exponent = (costs[r1] - costs[r2]) * beta_diff
+            if exponent >= 0 or self.rng.random() <= math.exp(exponent):
+                temperature_of[r1], temperature_of[r2] = t + 1, t
+                replica_at[t], replica_at[t + 1] = r2, r1
+
+    def return_report(self) -> dict:
+        """
+        Retorna o dicionario com com os resultados salvos (mesmo formato do SimulatedAnnealing)
+        """
+        return {
+            "best_cost": self.best_solution_cost,
+            "time_for_best_sol": self.best_solution_time,
+            "best_solution": [self.best_solution.to_list()],
+            "seed": self.run_seed,
+            }
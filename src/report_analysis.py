@@ -1,92 +1,227 @@
-import pandas as pd
+"""
+Análise dos resultados dos experimentos com agregação vetorizada (groupby). Os
+arquivos (.csv, .jsonl ou .parquet, quantos forem) são lidos em blocos só com
+as colunas usadas; de cada bloco saem agregados parciais por grupo (contagem,
+soma, soma dos quadrados, mínimo) que são combinados com os dos blocos
+anteriores, então a memória depende do número de grupos e não do número de
+execuções. As medianas precisam de todos os valores: são calculadas a partir
+de uma cópia enxuta (chaves e valores em float32), que pode ser desligada.
+"""
+import json
+import os
+from collections.abc import Iterator
+from statistics import NormalDist
 import numpy as np
-    
-def params_mean_calculate():
+import pandas as pd
+
+# métrica -> coluna dos resultados
+METRICS = {"cost": "best_cost", "time": "time_for_best_sol", "gap": "gap"}
+# nome da coluna do ótimo gravada por main.py e scheduler.run_unit
+OPTIMAL_COLUMN = "optimal_cost:"
+PARAM_COLUMNS = ("initial_temp", "cooling_func", "cooling_rate")
+
+
+def _jsonl_chunks(path: str, columns: list[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    # só as colunas pedidas, sem montar as rotas de best_solution em um DataFrame;
+    # linhas inválidas (a última cortada por uma queda) são ignoradas como no ResultsSink
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows.append({column: record.get(column) for column in columns})
+            if len(rows) == chunksize:
+                yield pd.DataFrame(rows, columns=columns)
+                rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def read_chunks(paths: list[str], columns: list[str], chunksize: int = 1 << 18) -> Iterator[pd.DataFrame]:
+    """Lê os arquivos de resultados em blocos
+
+    Args:
+        paths (list[str]): arquivos .csv, .jsonl (ou .json em linhas) ou .parquet
+        columns (list[str]): colunas usadas (as ausentes em um arquivo ficam vazias)
+        chunksize (int, optional): linhas por bloco. Defaults to 2**18.
+
+    Yields:
+        pd.DataFrame: bloco com as colunas pedidas
     """
-    Calcula a média para todas as instâncias na calibração de parâmentros
+    for path in paths:
+        match os.path.splitext(path)[1]:
+            case ".csv":
+                header = pd.read_csv(path, nrows=0).columns
+                chunks = pd.read_csv(path, usecols=[c for c in columns if c in header], chunksize=chunksize)
+            case ".jsonl" | ".json":
+                chunks = _jsonl_chunks(path, columns, chunksize)
+            case ".parquet":
+                import pyarrow.parquet as pq
+                parquet = pq.ParquetFile(path)
+                names = parquet.schema_arrow.names
+                chunks = (batch.to_pandas() for batch in
+                          parquet.iter_batches(batch_size=chunksize, columns=[c for c in columns if c in names]))
+            case extension:
+                raise ValueError(f"formato de resultados desconhecido: {extension}")
+        for chunk in chunks:
+            yield chunk.reindex(columns=columns)
+
+
+def _prepare(chunk: pd.DataFrame, by: list[str]) -> pd.DataFrame:
     """
-    df = pd.read_csv("/home/braga/work/CVRP/best_params_search_results_updated.csv")
-
-    vals_list = []
-    vals_dict = []
-    for initial_temp in set(df.initial_temp):
-        for cooling_func in set(df.cooling_func):
-            for cooling_rate in set(df.cooling_rate):
-                vals = df[
-                        (df.initial_temp == initial_temp) &
-                        (df.cooling_func == cooling_func) &
-                        (df.cooling_rate == cooling_rate)
-                        ].best_cost
-                med_val = vals.mean()
-                vals_list.append(med_val)
-                vals_dict.append(
-                    {
-                        "temp": initial_temp, 
-                        "cooling_func": cooling_func,
-                        "cooling_rate":cooling_rate,
-                        "mean":float(med_val)
-                    }
-                ) 
-                
-    pd.DataFrame(vals_dict).to_csv("mean_report_params.csv", index=False)
-    print(np.array(vals_list).min())
-    print(vals_dict[np.array(vals_list).argmin()])
-    
-def gen_all_instances_report(reports=["a_b.csv", "f.csv"]):
+    Converte as chaves em valores agrupáveis (listas como move_weights viram texto)
+    e calcula o gap de cada execução
+    """
+    for column in by:
+        if chunk[column].dtype == object:
+            chunk[column] = chunk[column].map(
+                lambda v: json.dumps(list(v)) if isinstance(v, (list, tuple, np.ndarray)) else v)
+    optimal = pd.to_numeric(chunk[OPTIMAL_COLUMN], errors="coerce")
+    chunk["gap"] = (chunk["best_cost"] - optimal) / optimal
+    chunk["optimal"] = optimal
+    return chunk
+
+
+def _t_quantile(confidence: float, dof: np.ndarray) -> np.ndarray:
+    """
+    Quantil da t de Student para o intervalo de confiança (normal se não houver scipy)
+    """
+    try:
+        from scipy.stats import t
+    except ImportError:
+        return np.full(len(dof), NormalDist().inv_cdf(0.5 + confidence / 2))
+    return t.ppf(0.5 + confidence / 2, np.maximum(dof, 1))
+
+
+def summarize(paths: list[str], by: list[str], confidence: float = 0.95, medians: bool = True,
+              chunksize: int = 1 << 18) -> pd.DataFrame:
+    """Estatísticas de custo, tempo até a melhor solução e gap por grupo
+
+    Args:
+        paths (list[str]): arquivos de resultados (ver read_chunks)
+        by (list[str]): colunas que definem os grupos (instância, parâmetros...)
+        confidence (float, optional): nível do intervalo de confiança da média. Defaults to 0.95.
+        medians (bool, optional): calcula as medianas (guarda os valores em memória). Defaults to True.
+        chunksize (int, optional): linhas por bloco. Defaults to 2**18.
+
+    Returns:
+        pd.DataFrame: uma linha por grupo com n, optimal e, para cada métrica de METRICS,
+            <métrica>_min, _mean, _median, _std, _ci_low e _ci_high
+    """
+    by = list(by)
+    columns = list(dict.fromkeys(by + ["best_cost", "time_for_best_sol", OPTIMAL_COLUMN]))
+    totals = None
+    values = []
+    for chunk in read_chunks(paths, columns, chunksize):
+        chunk = _prepare(chunk, by)
+        aggregations = {"n": ("best_cost", "size"), "optimal": ("optimal", "max")}
+        for metric, column in METRICS.items():
+            chunk[f"{metric}_sq"] = chunk[column] ** 2
+            aggregations |= {
+                f"{metric}_count": (column, "count"),
+                f"{metric}_sum": (column, "sum"),
+                f"{metric}_sumsq": (f"{metric}_sq", "sum"),
+                f"{metric}_min": (column, "min"),
+                }
+        partial = chunk.groupby(by, dropna=False, sort=False).agg(**aggregations)
+        if totals is None:
+            totals = partial
+        else:
+            # combina com os agregados dos blocos anteriores
+            combined = pd.concat([totals, partial]).groupby(level=by, dropna=False, sort=False)
+            totals = combined.sum(min_count=1)
+            mins = [column for column in totals.columns if column.endswith("_min")]
+            totals[mins] = combined[mins].min()
+            totals["optimal"] = combined["optimal"].max()
+        if medians:
+            values.append(chunk[by + list(METRICS.values())].astype({c: "float32" for c in METRICS.values()}))
+    if totals is None:
+        raise ValueError("nenhum resultado encontrado")
+
+    result = totals[["n", "optimal"]].copy()
+    if medians:
+        median = pd.concat(values).groupby(by, dropna=False, sort=False).median()
+    for metric, column in METRICS.items():
+        n = totals[f"{metric}_count"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = totals[f"{metric}_sum"].to_numpy() / n
+            var = np.maximum(totals[f"{metric}_sumsq"].to_numpy() - n * mean ** 2, 0.0) / (n - 1)
+            half = _t_quantile(confidence, n - 1) * np.sqrt(var / n)
+        result[f"{metric}_min"] = totals[f"{metric}_min"]
+        result[f"{metric}_mean"] = mean
+        if medians:
+            result[f"{metric}_median"] = median[column].astype(float)
+        result[f"{metric}_std"] = np.sqrt(var)
+        result[f"{metric}_ci_low"] = mean - half
+        result[f"{metric}_ci_high"] = mean + half
+    return result.sort_index().reset_index()
+
+
+def params_mean_calculate(results: list[str] = ["best_params_search_results_updated.csv"],
+                          params: list[str] = PARAM_COLUMNS, output: str = "mean_report_params.csv") -> pd.DataFrame:
+    """Calcula a média para todas as instâncias na calibração de parâmentros
+
+    Args:
+        results (list[str], optional): arquivos de resultados da calibração.
+            Defaults to ["best_params_search_results_updated.csv"].
+        params (list[str], optional): colunas dos parâmetros. Defaults to PARAM_COLUMNS.
+        output (str, optional): arquivo .csv de saída. Defaults to "mean_report_params.csv".
+
+    Returns:
+        pd.DataFrame: estatísticas por combinação de parâmetros (ver summarize)
+    """
+    report = summarize(results, list(params))
+    report.to_csv(output, index=False)
+    # o gap compara instâncias de tamanhos diferentes, o custo só se não houver ótimo
+    metric = "gap_mean" if report["gap_mean"].notna().any() else "cost_mean"
+    best = report.loc[report[metric].idxmin()]
+    print(best[metric])
+    print(best.to_dict())
+    return report
+
+
+def gen_all_instances_report(reports: list[str] = ["a_b.csv", "f.csv"], output: str = "all_instances_report.csv",
+                             confidence: float = 0.95) -> pd.DataFrame:
     """Gera o report de todas as instâncias a partir dos reports individuais
 
     Args:
-        reports (list, optional): lista com os arquivos da saída das instâncias
+        reports (list[str], optional): lista com os arquivos da saída das instâncias
                                   Defaults to ["a_b.csv", "f.csv"].
+        output (str, optional): arquivo .csv de saída. Defaults to "all_instances_report.csv".
+        confidence (float, optional): nível dos intervalos de confiança. Defaults to 0.95.
+
+    Returns:
+        pd.DataFrame: uma linha por instância
     """
-    df = pd.DataFrame()
-    for report in reports:
-        df = pd.concat([df,pd.read_csv(report)], ignore_index=True)
-    print(df)
-    
-    df_saida = pd.DataFrame(columns=["Instância", "f_otima", "f_MH_min", "f_MH_med", "tempo_min", "tempo_med", "gap_min", "gap_med"])
-    for instance in sorted(set(df.name)):
-        f_med = 0.0
-        f_min = np.inf
-        f_optimal = 0.0
-        t_med = 0.0
-        t_min =  np.inf
-        gap_min = np.inf
-        gap_med = 0.0
-        for instance_no in df[(instance == df.name)].instance_no.values:
-            row = df[(instance == df.name) & (instance_no == df.instance_no)]
-            # print(row)
-            
-            f_optimal = row["optimal_cost:"].values[0]
-            
-            f_med += row["best_cost"].values[0]
-            t_med += row["time_for_best_sol"].values[0]
-            
-            t_min = row["time_for_best_sol"].values[0] if row["time_for_best_sol"].values[0] < t_min else t_min
-            f_min = row["best_cost"].values[0]  if row["best_cost"].values[0]  < f_min else f_min
-                
-        f_med = f_med/5.0
-        t_med = t_med/5.0
-        
-        gap_min = (f_min - f_optimal)/f_optimal
-        gap_med = (f_med - f_optimal)/f_optimal
-
-        df_saida = pd.concat([df_saida, pd.DataFrame([
-            {
-                "Instância": instance,
-                "f_otima": f"{f_optimal}",
-                "f_MH_min": f"{f_min}",
-                "f_MH_med": f"{f_med}",
-                "tempo_min": f"{t_min:.4}", 
-                "tempo_med": f"{t_med:.4}", 
-                "gap_min": f"{gap_min:.4}", 
-                "gap_med": f"{gap_med:.4}",
-            }]
-            )], ignore_index=True)
-        df_saida.to_csv("all_instances_report.csv", index=False)
-    print(df_saida)
-    
+    summary = summarize(reports, ["name"], confidence)
+    report = pd.DataFrame({
+        "Instância": summary["name"],
+        "n": summary["n"],
+        "f_otima": summary["optimal"],
+        "f_MH_min": summary["cost_min"],
+        "f_MH_med": summary["cost_mean"],
+        "f_MH_mediana": summary["cost_median"],
+        "f_MH_ic_inf": summary["cost_ci_low"],
+        "f_MH_ic_sup": summary["cost_ci_high"],
+        "tempo_min": summary["time_min"],
+        "tempo_med": summary["time_mean"],
+        "tempo_mediana": summary["time_median"],
+        "tempo_ic_inf": summary["time_ci_low"],
+        "tempo_ic_sup": summary["time_ci_high"],
+        "gap_min": summary["gap_min"],
+        "gap_med": summary["gap_mean"],
+        "gap_mediana": summary["gap_median"],
+        "gap_ic_inf": summary["gap_ci_low"],
+        "gap_ic_sup": summary["gap_ci_high"],
+        })
+    report.round(4).to_csv(output, index=False)
+    print(report)
+    return report
+
+
 if __name__ == '__main__':
     # params_mean_calculate()
     # gen_all_instances_report()
-    pass
\ No newline at end of file
+    pass
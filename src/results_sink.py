@@ -0,0 +1,138 @@
+"""
+Saída dos resultados dos experimentos em JSON Lines: cada execução terminada
+vira uma linha gravada na hora (flush + fsync), então uma queda no meio do
+experimento perde no máximo a execução em andamento. Ao reabrir o arquivo as
+execuções já gravadas são reconhecidas pela chave (instância, parâmetros,
+repetição/semente) e podem ser puladas, retomando o experimento.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+# chave das execuções dos experimentos: instância, parâmetros (params_key), limite
+# de tempo e repetição; mudar qualquer um deles é outra execução
+RUN_KEY_FIELDS = ("name", "params_key", "time_limit", "instance_no")
+
+
+def _to_json(value):
+    # tipos do numpy que aparecem nos reports
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"tipo não serializável: {type(value)}")
+
+
+def params_key(params: dict) -> str:
+    """Hash curto dos parâmetros de uma execução (inclui a semente, se houver)
+
+    Args:
+        params (dict): parâmetros do SimulatedAnnealing
+
+    Returns:
+        str: hash do JSON dos parâmetros com as chaves ordenadas
+    """
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=_to_json).encode()).hexdigest()[:16]
+
+
+class ResultsSink:
+    """
+    Arquivo .jsonl onde os resultados são adicionados um por vez
+    """
+    path: str
+    key_fields: tuple[str, ...]
+
+    def __init__(self, path: str, key_fields: tuple[str, ...] = ("name", "instance_no")):
+        """
+        Abre (ou cria) o arquivo para adicionar resultados
+
+        Args:
+            path (str): arquivo .jsonl
+            key_fields (tuple[str, ...], optional): campos que identificam uma execução.
+                Defaults to ("name", "instance_no").
+        """
+        self.path = path
+        self.key_fields = tuple(key_fields)
+        self.__file = open(path, "a+", encoding="utf-8")
+        # se a última linha ficou pela metade (queda durante a escrita) começa em uma nova linha
+        if self.__file.tell() > 0:
+            self.__file.seek(self.__file.tell() - 1)
+            if self.__file.read(1) != "\n":
+                self.__file.write("\n")
+
+    def key(self, record: dict) -> tuple:
+        """Chave de uma execução
+
+        Args:
+            record (dict): resultado
+
+        Returns:
+            tuple: valores dos key_fields (normalizados em JSON para comparar float/int/str)
+        """
+        return tuple(json.dumps(record.get(field), default=_to_json) for field in self.key_fields)
+
+    def records(self) -> list[dict]:
+        """
+        Resultados já gravados (linhas incompletas são ignoradas)
+        """
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def completed(self) -> set[tuple]:
+        """
+        Chaves das execuções já gravadas, para pular no reinício
+        """
+        return {self.key(record) for record in self.records()}
+
+    def write(self, record: dict):
+        """Adiciona um resultado e garante que ele está no disco
+
+        Args:
+            record (dict): resultado (valores serializáveis em JSON)
+        """
+        self.__file.write(json.dumps(record, default=_to_json) + "\n")
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def close(self):
+        """
+        Fecha o arquivo
+        """
+        self.__file.close()
+
+    def __enter__(self) -> "ResultsSink":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_csv(jsonl_path: str, csv_path: str):
+    """Converte os resultados .jsonl para o .csv usado pelos scripts de análise
+
+    Args:
+        jsonl_path (str): arquivo .jsonl
+        csv_path (str): arquivo .csv de saída
+    """
+    import pandas as pd
+    pd.read_json(jsonl_path, lines=True).to_csv(csv_path, index=False)
+
+
+def run_record(report: dict, **fields) -> dict:
+    """Registro de uma execução para o ResultsSink
+
+    Args:
+        report (dict): SimulatedAnnealing.return_report()
+        **fields: identificação da execução (instância, parâmetros, repetição)
+
+    Returns:
+        dict: campos de identificação seguidos do report, com as rotas fora da lista do DataFrame
+    """
+    return {**fields, **report, "best_solution": report["best_solution"][0]}
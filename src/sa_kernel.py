@@ -0,0 +1,286 @@
+"""
+Motor compilado (numba, modo nopython) do laço do Simulated Annealing.
+Executa as mesmas quatro perturbações de CVRP.generate_new_solution e os mesmos
+cooling schedules de SimulatedAnnealing sobre a solução em tour gigante
+(tour + offsets, ver Solution), voltando para o Python somente a cada bloco
+de iterações para checar o limite de tempo.
+
+Sem o numba instalado as funções continuam executáveis em Python puro, mas
+NUMBA_AVAILABLE fica False e o SimulatedAnnealing usa o motor em Python.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # decorador vazio quando o numba não está instalado
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# código de cada cooling schedule dentro do kernel
+COOLING_FUNCS = {"exp": 0, "log": 1, "lin": 2}
+
+
+@njit(cache=True)
+def seed(value: int):
+    """Inicializa o gerador aleatório usado dentro do kernel
+
+    Args:
+        value (int): semente
+    """
+    np.random.seed(value)
+
+
+@njit(cache=True)
+def _next_temp(start_temp, cooling, cooling_rate, iteration):
+    # mesmo cálculo de SimulatedAnnealing.__next_temp
+    if cooling == 0:
+        return start_temp * (cooling_rate ** iteration)
+    elif cooling == 1:
+        return start_temp / np.log(1 + iteration)
+    return start_temp - cooling_rate * iteration
+
+
+@njit(cache=True)
+def _route_cost(tour, start, stop, dist):
+    cost = 0.0
+    for i in range(start, stop - 1):
+        cost += dist[tour[i], tour[i + 1]]
+    return int(np.rint(cost))
+
+
+@njit(cache=True)
+def _sample(low, high, k):
+    # k índices distintos de range(low, high) (Fisher-Yates parcial)
+    pool = np.arange(low, high)
+    for t in range(k):
+        r = np.random.randint(t, high - low)
+        pool[t], pool[r] = pool[r], pool[t]
+    return pool[:k].copy()
+
+
+@njit(cache=True)
+def _rescore(tour, offsets, costs, dist, route):
+    # recalcula o custo da rota e devolve a variação
+    new_cost = _route_cost(tour, offsets[route], offsets[route + 1], dist)
+    delta = new_cost - costs[route]
+    costs[route] = new_cost
+    return delta
+
+
+@njit(cache=True)
+def _multiple_insertion(tour, offsets, costs, dist, touched):
+    n_routes = len(offsets) - 1
+    for _ in range(np.random.randint(1, n_routes + 1)):
+        route = np.random.randint(0, n_routes)
+        start, stop = offsets[route], offsets[route + 1]
+        size = stop - start
+        if size < 3:
+            continue # rota só com os depósitos
+        num = np.random.randint(1, size - 1)
+        # elementos selecionados na ordem decrescente de posição
+        selected_idx = np.sort(_sample(1, size - 1, num))[::-1]
+        selected = np.empty(num, dtype=tour.dtype)
+        removed = np.zeros(size, dtype=np.bool_)
+        for t in range(num):
+            selected[t] = tour[start + selected_idx[t]]
+            removed[selected_idx[t]] = True
+        rest = np.empty(size - num, dtype=tour.dtype)
+        k = 0
+        for i in range(size):
+            if not removed[i]:
+                rest[k] = tour[start + i]
+                k += 1
+        insert_position = np.random.randint(1, size - num)
+        k = start
+        for i in range(insert_position):
+            tour[k] = rest[i]
+            k += 1
+        for t in range(num):
+            tour[k] = selected[t]
+            k += 1
+        for i in range(insert_position, size - num):
+            tour[k] = rest[i]
+            k += 1
+        touched[route] = True
+    delta = 0
+    for route in range(n_routes):
+        if touched[route]:
+            delta += _rescore(tour, offsets, costs, dist, route)
+    return delta
+
+
+@njit(cache=True)
+def _two_way_swap(tour, offsets, costs, loads, dist, demand, capacity, touched):
+    n_routes = len(offsets) - 1
+    valid = np.empty(n_routes, dtype=np.int64)
+    n_valid = 0
+    for route in range(n_routes):
+        if offsets[route + 1] - offsets[route] > 2:
+            valid[n_valid] = route
+            n_valid += 1
+    if n_valid < 2:
+        return 0, True
+    pair = _sample(0, n_valid, 2)
+    route1, route2 = valid[pair[0]], valid[pair[1]]
+    start1, start2 = offsets[route1], offsets[route2]
+    size1, size2 = offsets[route1 + 1] - start1, offsets[route2 + 1] - start2
+    max_swap = min(size1 - 2, size2 - 2)
+    num = np.random.randint(1, max_swap + 1)
+    idx1 = np.sort(_sample(1, size1 - 1, num))
+    idx2 = np.sort(_sample(1, size2 - 1, num))
+    load_diff = 0
+    for t in range(num):
+        u, v = tour[start1 + idx1[t]], tour[start2 + idx2[t]]
+        tour[start1 + idx1[t]], tour[start2 + idx2[t]] = v, u
+        load_diff += demand[v] - demand[u]
+    loads[route1] += load_diff
+    loads[route2] -= load_diff
+    touched[route1] = True
+    touched[route2] = True
+    if loads[route1] > capacity or loads[route2] > capacity:
+        return 0, False
+    delta = _rescore(tour, offsets, costs, dist, route1)
+    delta += _rescore(tour, offsets, costs, dist, route2)
+    return delta, True
+
+
+@njit(cache=True)
+def _pick_route(offsets, min_size):
+    # rota aleatória entre as que têm mais de min_size posições (-1 se não houver)
+    n_routes = len(offsets) - 1
+    valid = np.empty(n_routes, dtype=np.int64)
+    n_valid = 0
+    for route in range(n_routes):
+        if offsets[route + 1] - offsets[route] > min_size:
+            valid[n_valid] = route
+            n_valid += 1
+    if n_valid == 0:
+        return -1
+    return valid[np.random.randint(0, n_valid)]
+
+
+@njit(cache=True)
+def _two_opt(tour, offsets, costs, dist, touched):
+    route = _pick_route(offsets, 3)
+    if route < 0:
+        return 0
+    start = offsets[route]
+    idx = np.sort(_sample(1, offsets[route + 1] - start - 1, 2))
+    i, j = start + idx[0], start + idx[1]
+    a, b, c, e = tour[i - 1], tour[i], tour[j], tour[j + 1]
+    delta = int(np.rint(dist[a, c] + dist[b, e] - dist[a, b] - dist[c, e]))
+    while i < j:
+        tour[i], tour[j] = tour[j], tour[i]
+        i += 1
+        j -= 1
+    costs[route] += delta
+    touched[route] = True
+    return delta
+
+
+@njit(cache=True)
+def _greedy(tour, offsets, costs, dist, touched):
+    route = _pick_route(offsets, 3)
+    if route < 0:
+        return 0
+    start, stop = offsets[route], offsets[route + 1]
+    non_visited = tour[start + 1:stop - 1].copy()
+    remaining = len(non_visited)
+    v_i = tour[start]
+    k = start + 1
+    while remaining > 0:
+        min_path_i = 0
+        for t in range(1, remaining):
+            if dist[v_i, non_visited[t]] < dist[v_i, non_visited[min_path_i]]:
+                min_path_i = t
+        v_i = non_visited[min_path_i]
+        tour[k] = v_i
+        k += 1
+        # remove mantendo a ordem (mesmo desempate do argmin em Python)
+        for t in range(min_path_i, remaining - 1):
+            non_visited[t] = non_visited[t + 1]
+        remaining -= 1
+    touched[route] = True
+    return _rescore(tour, offsets, costs, dist, route)
+
+
+@njit(cache=True)
+def anneal(tour, offsets, costs, loads, dist, demand, capacity,
+           backup_tour, backup_costs, backup_loads, best_tour,
+           iteration_n, n_iterations, current_cost, best_cost, temp,
+           start_temp, cooling, cooling_rate):
+    """Executa n_iterations do Simulated Annealing alterando os buffers no lugar
+
+    Args:
+        tour, offsets, costs, loads (np.ndarray): solução atual (ver Solution)
+        dist (np.ndarray): matriz de distâncias
+        demand (np.ndarray): demanda de cada vértice
+        capacity (int): capacidade do caminhão
+        backup_tour, backup_costs, backup_loads (np.ndarray): cópia da solução atual
+            usada para desfazer as perturbações rejeitadas
+        best_tour (np.ndarray): melhor tour encontrado
+        iteration_n (int): número da iteração atual
+        n_iterations (int): quantas iterações executar
+        current_cost, best_cost (int): custo da solução atual e da melhor
+        temp (float): temperatura atual
+        start_temp (float): temperatura inicial
+        cooling (int): código do cooling schedule (COOLING_FUNCS)
+        cooling_rate (float): taxa de resfriamento
+
+    Returns:
+        tuple: iteration_n, current_cost, best_cost, temp e a iteração da última melhora
+            (-1 se não houve melhora neste bloco)
+    """
+    n_routes = len(offsets) - 1
+    touched = np.zeros(n_routes, dtype=np.bool_)
+    best_iteration = -1
+    for _ in range(n_iterations):
+        touched[:] = False
+        feasible = True
+        move = np.random.randint(0, 4)
+        if move == 0:
+            delta = _multiple_insertion(tour, offsets, costs, dist, touched)
+        elif move == 1:
+            delta, feasible = _two_way_swap(tour, offsets, costs, loads, dist, demand, capacity, touched)
+        elif move == 2:
+            delta = _two_opt(tour, offsets, costs, dist, touched)
+        else:
+            delta = _greedy(tour, offsets, costs, dist, touched)
+
+        accept = False
+        if not feasible:
+            accept = False
+        elif delta < 0:
+            accept = True
+        elif delta == 0:
+            accept = False
+        elif not temp <= 0.0 and np.random.random() <= np.exp(-delta / temp):
+            accept = True
+            temp = _next_temp(start_temp, cooling, cooling_rate, iteration_n)
+
+        for route in range(n_routes):
+            if not touched[route]:
+                continue
+            start, stop = offsets[route], offsets[route + 1]
+            if accept:
+                backup_tour[start:stop] = tour[start:stop]
+                backup_costs[route] = costs[route]
+                backup_loads[route] = loads[route]
+            else:
+                tour[start:stop] = backup_tour[start:stop]
+                costs[route] = backup_costs[route]
+                loads[route] = backup_loads[route]
+        if accept:
+            current_cost += delta
+            if current_cost < best_cost:
+                best_cost = current_cost
+                best_tour[:] = tour
+                best_iteration = iteration_n
+        iteration_n += 1
+    return iteration_n, current_cost, best_cost, temp, best_iteration
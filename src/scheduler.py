@@ -0,0 +1,118 @@
+"""
+Escalonamento dos experimentos em lote: o trabalho é quebrado em unidades
+(instância, repetição, parâmetros), uma execução do Simulated Annealing cada,
+distribuídas com imap_unordered na ordem da mais longa para a mais curta. Assim
+nenhum núcleo fica parado no fim esperando um processo com várias repetições
+pendentes, o tempo total se aproxima de (tempo de CPU / núcleos) e a barra de
+progresso avança a cada execução, com estimativa de tempo restante real.
+Cada instância é lida uma única vez no processo principal e publicada em
+memória compartilhada (ver shared_instance); os processos do pool montam a
+CVRP sobre esses blocos, sem ler o .vrp nem construir a matriz de novo.
+"""
+import os
+import re
+from contextlib import ExitStack
+from multiprocessing import Pool
+from tqdm import tqdm
+from cvrp import CVRP
+from simulated_annealing import SimulatedAnnealing
+from results_sink import ResultsSink, params_key, run_record
+from shared_instance import SharedInstance, attach
+
+
+def instance_size(instance_path: str) -> int:
+    """Número de vértices da instância sem ler o arquivo inteiro
+
+    Args:
+        instance_path (str): path do arquivo .vrp
+
+    Returns:
+        int: dimensão da instância (pelo nome "X-n<dim>-k<caminhões>" ou pelo cabeçalho)
+    """
+    match = re.search(r"-n(\d+)", os.path.basename(instance_path))
+    if match:
+        return int(match.group(1))
+    with open(instance_path) as f:
+        for line in f:
+            if line.startswith("DIMENSION"):
+                return int(line.split(":")[1])
+            if line.startswith("NODE_COORD_SECTION"):
+                break
+    return 0
+
+
+def make_units(instance_paths: list[str], repetitions: int, params_list: list[dict],
+               time_limit: float, sink: ResultsSink | None = None) -> list[dict]:
+    """Cria as unidades de trabalho, ordenadas da mais longa para a mais curta
+    (limite de tempo e depois tamanho da instância, que domina a carga e a matriz)
+
+    Args:
+        instance_paths (list[str]): arquivos .vrp
+        repetitions (int): repetições de cada combinação
+        params_list (list[dict]): parâmetros do SimulatedAnnealing de cada configuração
+        time_limit (float): limite de tempo de cada execução
+        sink (ResultsSink | None, optional): se passado, as execuções já gravadas são puladas.
+            Defaults to None.
+
+    Returns:
+        list[dict]: unidades {"path", "fields", "params", "time_limit"}, onde
+            fields identifica a execução no registro (name, instance_no, time_limit, os parâmetros
+            e params_key, ver RUN_KEY_FIELDS)
+    """
+    done = sink.completed() if sink is not None else set()
+    units = []
+    for path in instance_paths:
+        for params in params_list:
+            for i in range(repetitions):
+                fields = {"name": os.path.basename(path), "instance_no": i, "time_limit": time_limit, **params,
+                          "params_key": params_key(params)}
+                if sink is not None and sink.key(fields) in done:
+                    continue
+                units.append({"path": path, "fields": fields, "params": params, "time_limit": time_limit})
+    units.sort(key=lambda unit: (-unit["time_limit"], -instance_size(unit["path"]), unit["path"]))
+    return units
+
+
+def run_unit(unit: dict) -> dict:
+    """Executa uma unidade de trabalho (no processo do pool)
+
+    Args:
+        unit (dict): unidade criada por make_units, com o "handle" da instância
+            publicada por run_units
+
+    Returns:
+        dict: registro da execução (ver run_record)
+    """
+    # attach reaproveita a instância já montada neste processo
+    instance = attach(unit["handle"])
+    sa = SimulatedAnnealing(time_limit=unit["time_limit"], **unit["params"])
+    sa.optimize(instance)
+    return run_record(sa.return_report(), **unit["fields"], **{"optimal_cost:": instance.optimal_value})
+
+
+def run_units(units: list[dict], sink: ResultsSink, processes: int = os.cpu_count(),
+              cache_dir: str | None = None, desc: str = "Execuções"):
+    """Distribui as unidades no pool e grava cada resultado no sink assim que chega
+
+    Args:
+        units (list[dict]): unidades criadas por make_units (já ordenadas)
+        sink (ResultsSink): saída dos resultados
+        processes (int, optional): quantidade de processos. Defaults to os.cpu_count().
+        cache_dir (str | None, optional): pasta do cache binário usado ao ler as instâncias
+            no processo principal. Defaults to None.
+        desc (str, optional): descrição da barra de progresso. Defaults to "Execuções".
+    """
+    if not units:
+        return
+    with ExitStack() as shared:
+        # uma cópia de cada instância para todos os processos (os blocos são removidos ao sair)
+        handles = {}
+        for path in dict.fromkeys(unit["path"] for unit in units):
+            handles[path] = shared.enter_context(SharedInstance(CVRP(path, cache_dir=cache_dir))).handle
+        units = [{**unit, "handle": handles[unit["path"]]} for unit in units]
+        with Pool(processes=processes) as pool:
+            # chunksize=1: cada processo pega a próxima unidade só quando termina a atual
+            results = pool.imap_unordered(run_unit, units, chunksize=1)
+            # smoothing=0: estimativa pela taxa média, as unidades têm duração parecida
+            for record in tqdm(results, total=len(units), desc=desc, smoothing=0):
+                sink.write(record)
@@ -0,0 +1,127 @@
+"""
+Publicação dos arrays de uma instância em multiprocessing.shared_memory para
+que os processos filhos montem a CVRP sobre eles sem cópia: a matriz de
+distâncias existe uma única vez na memória, independente do número de processos.
+
+Uso:
+    with SharedInstance(instance) as shared:
+        pool.map(func, [(shared.handle, ...), ...])   # no filho: attach(handle)
+"""
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from cvrp import CVRP
+
+# arrays da instância publicados (nome no dicionário de dados -> atributo da CVRP)
+SHARED_ARRAYS = {
+    "node_coord": "V",
+    "demand": "vertex_demand",
+    "distance_matrix": "distance_matrix",
+    "neighbors": "neighbors",
+}
+
+# instâncias já montadas neste processo (uma por publicação)
+_attached: dict[str, CVRP] = {}
+
+
+class SharedInstance:
+    """
+    Dono dos blocos de memória compartilhada de uma instância. Somente o
+    processo que publica (este objeto) remove os blocos, em close() ou ao sair do with.
+    """
+    handle: dict
+
+    def __init__(self, instance: CVRP):
+        """
+        Copia os arrays da instância para blocos de memória compartilhada
+
+        Args:
+            instance (CVRP): instância já carregada
+        """
+        self.__blocks = []
+        arrays = {}
+        try:
+            for key, attr in SHARED_ARRAYS.items():
+                if attr == "neighbors" and not instance.neighbors_built:
+                    continue # cada processo calcula se precisar (backend "lazy")
+                value = getattr(instance, attr)
+                if value is None:
+                    continue # backend "lazy" não tem matriz
+                value = np.ascontiguousarray(value)
+                block = SharedMemory(create=True, size=max(1, value.nbytes))
+                self.__blocks.append(block)
+                np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+                arrays[key] = (block.name, value.shape, value.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+        self.handle = {
+            "meta": {
+                "name": instance.name,
+                "number_of_trucks": instance.number_of_trucks,
+                "optimal_value": getattr(instance, "optimal_value", None),
+                "capacity": instance.truck_capacity,
+                "depot": instance.depot_i,
+                "neighbors_k": instance.neighbors_k,
+                },
+            "arrays": arrays,
+            }
+
+    def close(self):
+        """
+        Libera e remove os blocos de memória compartilhada
+        """
+        while self.__blocks:
+            block = self.__blocks.pop()
+            block.close()
+            block.unlink()
+
+    def __enter__(self) -> "SharedInstance":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_block(name: str) -> SharedMemory:
+    # quem só usa o bloco não deve registrá-lo no resource tracker, senão ele é
+    # removido quando este processo sair (ou o registro do dono é apagado, com fork)
+    try:
+        return SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def attach(handle: dict) -> CVRP:
+    """Monta a CVRP sobre os blocos publicados por SharedInstance (sem copiar os arrays).
+    Chamadas repetidas no mesmo processo devolvem a mesma instância
+
+    Args:
+        handle (dict): SharedInstance.handle
+
+    Returns:
+        CVRP: instância cujos arrays são vistas da memória compartilhada
+    """
+    key = handle["arrays"]["node_coord"][0]
+    if key in _attached:
+        return _attached[key]
+    data = dict(handle["meta"])
+    blocks = []
+    for name, (block_name, shape, dtype) in handle["arrays"].items():
+        block = _open_block(block_name)
+        blocks.append(block)
+        data[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    instance = CVRP.from_data(
+        data,
+        distance_backend="dense" if "distance_matrix" in data else "lazy",
+        neighbors_k=data["neighbors_k"],
+        )
+    # mantém os blocos abertos enquanto a instância existir
+    instance.shared_blocks = blocks
+    _attached[key] = instance
+    return instance
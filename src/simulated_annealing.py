@@ -1,8 +1,16 @@
-import random
+import secrets
 from cvrp import CVRP
-from time import time
+from solution import Solution
+from time import time, perf_counter, process_time
 import numpy as np
 import math
+import warnings
+from construction import build_initial_solution
+from local_search import LocalSearch
+from operator_selection import AdaptiveOperatorSelection
+from instrumentation import Instrumentation
+from convergence_trace import ConvergenceTrace
+import checkpoint
 
 class SimulatedAnnealing:
     
@@ -12,19 +20,78 @@ class SimulatedAnnealing:
     initial_solution: list[list[int]]
     
     # após otimizar são encontrados estes valores
-    best_solution: list[list[int]]
+    best_solution: Solution
     best_solution_cost: float
     start_time: float
     finish_time: float
     total_time_spent: float
     best_solution_time: float
+    # semente usada na última execução (a passada em seed ou uma sorteada)
+    run_seed: int
+    # estatísticas por perturbação (somente com operator_selection="adaptive")
+    move_stats: dict[str, dict] | None = None
+    # resumo da instrumentação (somente com instrument=True, ver Instrumentation.to_dict)
+    profile: dict | None = None
     
-    def __init__(self, initial_temp:float = 0.0, cooling_func="log", cooling_rate=0.9, time_limit:float = 0.0,  iteration_limit:float=np.inf):
+    def __init__(self, initial_temp:float = 0.0, cooling_func="log", cooling_rate=0.9, time_limit:float = 0.0,  iteration_limit:float=np.inf,
+                 granular: bool = False, engine: str = "python", kernel_chunk: int = 10000,
+                 batch_size: int = 1, batch_select: str = "best", constructor: str = "random",
+                 move_weights: list[float] | None = None, operator_selection: str = "uniform",
+                 instrument: bool = False, profile_path: str | None = None, trace_path: str | None = None,
+                 trace_interval: float = 5.0, checkpoint_path: str | None = None, checkpoint_interval: float = 60.0,
+                 seed: int | None = None, local_search_every: int = 0, final_local_search: bool = False):
+        # argumentos do construtor, gravados no checkpoint para recriar o otimizador
+        self.init_params = {name: value for name, value in locals().items() if name != "self"}
         self.start_temp = initial_temp
         self.cooling_func = cooling_func
         self.cooling_rate= cooling_rate
         self.time_limit = float(time_limit)
         self.iteration_limit = iteration_limit
+        # semente da execução (None sorteia uma nova a cada optimize, registrada em return_report)
+        self.seed = seed
+        # modo determinístico: sem limite de tempo e com limite de iterações; com a mesma
+        # semente a trajetória é idêntica (nada na busca depende do tempo medido)
+        self.deterministic = self.time_limit <= 0 and iteration_limit < np.inf
+        # perturbações restritas à lista de vizinhos mais próximos
+        self.granular = granular
+        # "python" ou "numba" (laço compilado, volta ao Python a cada kernel_chunk iterações)
+        self.engine = engine
+        self.kernel_chunk = kernel_chunk
+        # batch_size > 1 avalia lotes de candidatos vetorizados por iteração
+        # ("best" escolhe o melhor do lote, "metropolis" sorteia pelo peso exp(-delta/T))
+        self.batch_size = batch_size
+        self.batch_select = batch_select
+        # solução inicial: "random" (gen_initial_sol), "savings" ou "sweep"
+        self.constructor = constructor
+        # peso de sorteio de cada perturbação (ordem de cvrp.MOVES), None = uniforme
+        self.move_weights = move_weights
+        # "uniform" (ou move_weights fixos) ou "adaptive" (roleta do ALNS, ver operator_selection);
+        # nenhum dos dois vale com batch_size > 1
+        self.operator_selection = operator_selection
+        # contadores, tempo amostrado das fases e snapshots periódicos (ver instrumentation);
+        # profile_path grava o resumo em JSON ao fim de optimize
+        self.instrument = instrument or profile_path is not None
+        self.profile_path = profile_path
+        if batch_size > 1 and (granular or self.instrument or move_weights is not None
+                               or operator_selection != "uniform"):
+            # o lote vetorizado sorteia entre 2-opt e swap por conta própria e não usa a lista
+            # de vizinhos nem os pontos de medição de generate_new_solution
+            raise ValueError("batch_size > 1 não pode ser combinado com granular, move_weights, "
+                             "operator_selection=\"adaptive\" nem com a instrumentação")
+        # grava a convergência (ConvergenceTrace) em .npy a cada trace_interval segundos e ao
+        # fim de optimize, então uma execução interrompida deixa o trace até a última gravação
+        self.trace_path = trace_path
+        self.trace_interval = trace_interval
+        # checkpoint atômico a cada checkpoint_interval segundos (ver optimize(resume=True))
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        # busca local determinística (ver local_search) na melhor solução a cada
+        # local_search_every iterações (0 desliga) e/ou uma vez ao fim de optimize
+        self.local_search_every = local_search_every
+        self.final_local_search = final_local_search
+        self.__local_search = None
+        # custo da melhor solução na última busca local (a busca não se repete sem nova melhor)
+        self.__intensified_cost = None
         
     
     def __next_temp(self, iteration: int) -> float:
@@ -47,70 +114,351 @@ class SimulatedAnnealing:
                 return self.start_temp - self.cooling_rate * iteration
         
     
-    def optimize(self, instance: CVRP, gen_chart=False) -> None | dict[str, list[str]]:
+    @classmethod
+    def from_checkpoint(cls, checkpoint_path: str) -> "SimulatedAnnealing":
+        """Recria o otimizador com os mesmos parâmetros da execução do checkpoint.
+        A execução continua com optimize(instance, resume=True)
+
+        Args:
+            checkpoint_path (str): arquivo do checkpoint
+
+        Returns:
+            SimulatedAnnealing: otimizador configurado como o original
+        """
+        state = checkpoint.load(checkpoint_path)
+        if state is None:
+            raise FileNotFoundError(checkpoint_path)
+        return cls(**{**state["params"], "checkpoint_path": checkpoint_path})
+
+    @classmethod
+    def resume(cls, instance: CVRP, checkpoint_path: str) -> "SimulatedAnnealing":
+        """Continua a execução do checkpoint exatamente de onde parou (mesma
+        solução atual, melhor solução, temperatura, iteração, tempo gasto e estado
+        dos geradores aleatórios)
+
+        Args:
+            instance (CVRP): instância da execução original
+            checkpoint_path (str): arquivo do checkpoint
+
+        Returns:
+            SimulatedAnnealing: otimizador com a execução terminada
+        """
+        sa = cls.from_checkpoint(checkpoint_path)
+        sa.optimize(instance, resume=True)
+        return sa
+
+    def __seed_run(self, instance: CVRP):
+        """Escolhe a semente da execução e reinicia os geradores da instância com ela
+
+        Args:
+            instance (CVRP): instância do CVRP
+        """
+        self.run_seed = self.seed if self.seed is not None else secrets.randbits(63)
+        instance.seed(self.run_seed)
+
+    def __effective_time_limit(self) -> float:
+        """
+        Limite de tempo do laço (ilimitado no modo determinístico)
+        """
+        return np.inf if self.deterministic else self.time_limit
+
+    def optimize(self, instance: CVRP, gen_chart=False, resume=False) -> None | dict[str, np.ndarray]:
         """Otimiza e gera uma solução para a instância
 
         Args:
             instance (CVRP): instância do CVRP
             gen_chart (bool, optional): se gera ou não o gráfico. Defaults to False.
+            resume (bool, optional): continua do checkpoint_path, se existir. Defaults to False.
 
         Returns:
-            None | dict[str, list[str]]: nada ou dados para geração do gráfico
+            None | dict[str, np.ndarray]: nada ou dados para geração do gráfico (todas as
+                novas melhores e uma amostra logarítmica das iterações, ver ConvergenceTrace)
         """
-        if gen_chart:
-            chart_dict = { "iterations":[], "f_obj_val":[]}
-        self.start_time = time()
-        self.initial_solution = instance.gen_initial_sol()
-        
-        self.best_solution = self.initial_solution
-        self.best_solution_cost = round(instance.calculate_cost(self.initial_solution))
-        
-        current_solution = self.best_solution
-        current_s_cost = self.best_solution_cost
-        
-        iteration_n = 1
-        time_diff = 0.0 
-        self.best_solution_time = 0.0
-        actual_temp = self.start_temp
-        while time_diff < self.time_limit and iteration_n < self.iteration_limit:
+        self.__intensified_cost = None
+        if self.engine == "numba":
+            # importado só aqui: carregar o numba leva mais tempo que uma execução curta inteira
+            import sa_kernel
+            # o motor compilado precisa do numba e da matriz densa, não grava o gráfico e sorteia as perturbações uniformemente
+            if (sa_kernel.NUMBA_AVAILABLE and instance.distance_matrix is not None
+                    and not gen_chart and self.trace_path is None and not self.granular and self.batch_size <= 1
+                    and self.move_weights is None and self.operator_selection == "uniform"
+                    and not self.instrument and self.checkpoint_path is None and not self.local_search_every):
+                return self.__optimize_compiled(instance)
+            warnings.warn("motor numba indisponível para esta execução, usando o motor em Python")
+        trace = ConvergenceTrace() if gen_chart or self.trace_path is not None else None
+        state = None
+        if resume and self.checkpoint_path is not None:
+            state = checkpoint.load(self.checkpoint_path)
+        if state is None:
+            self.__seed_run(instance)
+            self.start_time = time()
+            self.initial_solution = build_initial_solution(instance, self.constructor)
+            
+            # custo e carga por rota mantidos em cache para a avaliação incremental
+            current_solution = Solution.from_routes(instance, self.initial_solution)
+            self.best_solution = current_solution.copy()
+            self.best_solution_cost = current_solution.cost
+            
+            current_s_cost = self.best_solution_cost
+            
+            iteration_n = 1
+            time_diff = 0.0 
+            self.best_solution_time = 0.0
+            actual_temp = self.start_temp
+            selector = None
+            if self.operator_selection == "adaptive":
+                selector = AdaptiveOperatorSelection(instance.rng, effort="count" if self.deterministic else "time")
+            instrumentation = Instrumentation() if self.instrument else None
+        else:
+            if state["instance"] != instance.name:
+                raise ValueError(f"checkpoint é da instância {state['instance']}, não de {instance.name}")
+            # continua do checkpoint: o tempo gasto antes conta para o time_limit
+            time_diff = state["time_diff"]
+            self.start_time = time() - time_diff
+            self.initial_solution = state["initial_solution"]
+            current_solution = state["current_solution"]
+            current_s_cost = current_solution.cost
+            self.best_solution = state["best_solution"]
+            self.best_solution_cost = self.best_solution.cost
+            self.best_solution_time = state["best_solution_time"]
+            iteration_n = state["iteration_n"]
+            actual_temp = state["actual_temp"]
+            selector = state["selector"]
+            instrumentation = state["instrumentation"]
+            if state["trace"] is not None:
+                trace = state["trace"]
+            self.run_seed = state["run_seed"]
+            # o seletor (se houver) aponta para este mesmo gerador, foram gravados juntos
+            instance.rng = state["rng"]
+            instance.batch_rng.bit_generator.state = state["batch_rng_state"]
+        next_checkpoint = time_diff + self.checkpoint_interval
+        next_trace_save = time_diff + self.trace_interval
+        rng = instance.rng
+        time_limit = self.__effective_time_limit()
+        while time_diff < time_limit and iteration_n < self.iteration_limit:
+            sampled = instrumentation is not None and instrumentation.sampling(iteration_n)
+            if sampled:
+                # só esta iteração tem as fases cronometradas
+                instance.profile = instrumentation.phase_times
+                phase_start = perf_counter()
             # busca local
-            new_solution = instance.generate_new_solution(current_solution)
-            new_cost = round(instance.calculate_cost(new_solution))
-            cost_diff =  new_cost - current_s_cost
+            # a perturbação é aplicada na própria solução atual (commit aceita, undo rejeita)
+            if self.batch_size > 1:
+                cost_diff = instance.generate_batch_solution(
+                    current_solution, self.batch_size, self.batch_select, actual_temp)
+            elif selector is not None:
+                move = selector.select()
+                # tempo de CPU do processo: a espera por outros processos não pesa contra a perturbação
+                move_start = process_time()
+                cost_diff = instance.generate_new_solution(current_solution, self.granular, move=move)
+                move_time = process_time() - move_start
+            else:
+                cost_diff = instance.generate_new_solution(current_solution, self.granular, self.move_weights)
+            if sampled:
+                instance.profile = None
+                accept_start = perf_counter()
+                instrumentation.phase_times["move"] += accept_start - phase_start
+            new_cost = current_s_cost + cost_diff
+            decision_temp = actual_temp
+            accepted = True
             #aceita solução melhor com menor custo
             if cost_diff < 0:
+                current_solution.commit()
                 current_s_cost = new_cost
-                current_solution = new_solution
                 # se for melhor que a melhor solução troca
                 if new_cost < self.best_solution_cost:
                     self.best_solution_cost = new_cost
-                    self.best_solution = new_solution
+                    self.best_solution = current_solution.copy()
                     self.best_solution_time = time_diff
+                    if trace is not None:
+                        trace.record(iteration_n - 1, new_cost, best=True)
+                    if instrumentation is not None:
+                        instrumentation.record_best(time_diff, new_cost)
             elif cost_diff == 0:
-                pass
+                current_solution.undo()
+                accepted = False
             # aceita a solucao pior aleatoriamente seguindo uma funcao em relacao a temperatura atual
-            elif not actual_temp <= 0.0 and random.random() <= np.exp(-cost_diff/actual_temp):
+            elif not actual_temp <= 0.0 and rng.random() <= np.exp(-cost_diff/actual_temp):
+                current_solution.commit()
                 current_s_cost = new_cost
-                current_solution = new_solution
                 actual_temp = self.__next_temp(iteration_n)
                 # print(cost_diff,  math.exp(-cost_diff/actual_temp))
-            if gen_chart:
-                chart_dict["f_obj_val"].append(current_s_cost)
-                chart_dict["iterations"].append(iteration_n-1) # começa em 1 (-1 para começar em 0)
+            else:
+                current_solution.undo()
+                accepted = False
+            if selector is not None:
+                selector.update(move, cost_diff, accepted, move_time)
+            if instrumentation is not None:
+                if sampled:
+                    instrumentation.phase_times["acceptance"] += perf_counter() - accept_start
+                    instrumentation.sampled_iterations += 1
+                rejection = None
+                if not accepted:
+                    rejection = "metropolis" if cost_diff > 0 else instance.rejection or "zero_delta"
+                instrumentation.record(decision_temp, cost_diff, accepted, rejection)
+            # começa em 1 (-1 para começar em 0)
+            if trace is not None and iteration_n - 1 >= trace.next_sample:
+                trace.record(iteration_n - 1, current_s_cost)
             iteration_n += 1
             actual_time_stamp = time()
             time_diff = actual_time_stamp - self.start_time
+            if instrumentation is not None and instrumentation.snapshot_due(time_diff):
+                instrumentation.snapshot(time_diff, iteration_n, actual_temp, current_s_cost, self.best_solution_cost)
+            if self.local_search_every and iteration_n % self.local_search_every == 0:
+                if self.__intensify(instance, time_diff):
+                    # o annealing continua a partir da melhor solução melhorada
+                    current_solution = self.best_solution.copy()
+                    current_s_cost = self.best_solution_cost
+                    if trace is not None:
+                        trace.record(iteration_n - 1, current_s_cost, best=True)
+                    if instrumentation is not None:
+                        instrumentation.record_best(time_diff, current_s_cost)
+            if self.checkpoint_path is not None and time_diff >= next_checkpoint:
+                self.__save_checkpoint(instance, current_solution, iteration_n, time_diff, actual_temp,
+                                       selector, instrumentation, trace)
+                next_checkpoint = time_diff + self.checkpoint_interval
+            if self.trace_path is not None and time_diff >= next_trace_save:
+                trace.save(self.trace_path)
+                next_trace_save = time_diff + self.trace_interval
+        if self.checkpoint_path is not None:
+            # checkpoint final: retomar uma execução terminada só devolve o resultado
+            self.__save_checkpoint(instance, current_solution, iteration_n, time_diff, actual_temp,
+                                   selector, instrumentation, trace)
+        if self.final_local_search and self.__intensify(instance, time_diff):
+            if trace is not None:
+                trace.record(iteration_n - 1, self.best_solution_cost, best=True)
+            if instrumentation is not None:
+                instrumentation.record_best(time_diff, self.best_solution_cost)
         self.finish_time = time()
         self.total_time_spent = self.finish_time - self.start_time
+        self.move_stats = selector.stats() if selector is not None else None
+        if instrumentation is not None:
+            instrumentation.snapshot(time_diff, iteration_n, actual_temp, current_s_cost, self.best_solution_cost)
+            self.profile = instrumentation.to_dict(self.total_time_spent)
+            if self.profile_path is not None:
+                instrumentation.export(self.profile_path, self.total_time_spent)
+        if trace is not None and self.trace_path is not None:
+            trace.save(self.trace_path)
         if gen_chart:
-            return chart_dict
+            return trace.to_chart()
+    
+    def __intensify(self, instance: CVRP, time_diff: float) -> bool:
+        """Aplica a busca local na melhor solução
+
+        Args:
+            instance (CVRP): instância do CVRP
+            time_diff (float): tempo desde o início (instante da nova melhor)
+
+        Returns:
+            bool: se a melhor solução melhorou
+        """
+        if self.best_solution_cost == self.__intensified_cost:
+            # a melhor não mudou desde a última busca, que já a deixou num ótimo local
+            return False
+        if self.__local_search is None or self.__local_search.instance is not instance:
+            self.__local_search = LocalSearch(instance)
+        routes, gain = self.__local_search.run(self.best_solution.to_list())
+        if gain <= 0:
+            self.__intensified_cost = self.best_solution_cost
+            return False
+        self.best_solution = Solution.from_routes(instance, routes)
+        self.best_solution_cost = self.__intensified_cost = self.best_solution.cost
+        self.best_solution_time = time_diff
+        return True
+
+    def __save_checkpoint(self, instance: CVRP, current_solution: Solution, iteration_n: int, time_diff: float,
+                          actual_temp: float, selector: AdaptiveOperatorSelection | None,
+                          instrumentation: Instrumentation | None, trace: ConvergenceTrace | None):
+        """Grava o estado do laço de optimize (entre duas iterações, sem alterações pendentes)
+
+        Args:
+            instance (CVRP): instância do CVRP (estado do gerador dos lotes)
+            current_solution (Solution): solução atual
+            iteration_n (int): próxima iteração
+            time_diff (float): tempo gasto até aqui
+            actual_temp (float): temperatura atual
+            selector (AdaptiveOperatorSelection | None): seleção adaptativa das perturbações
+            instrumentation (Instrumentation | None): contadores da instrumentação
+            trace (ConvergenceTrace | None): registro da convergência
+        """
+        checkpoint.save(self.checkpoint_path, {
+            "params": self.init_params,
+            "instance": instance.name,
+            "initial_solution": self.initial_solution,
+            "current_solution": current_solution,
+            "best_solution": self.best_solution,
+            "best_solution_time": self.best_solution_time,
+            "iteration_n": iteration_n,
+            "time_diff": time_diff,
+            "actual_temp": actual_temp,
+            "selector": selector,
+            "instrumentation": instrumentation,
+            "trace": trace,
+            "run_seed": self.run_seed,
+            "rng": instance.rng,
+            "batch_rng_state": instance.batch_rng.bit_generator.state,
+            })
+
+    def __optimize_compiled(self, instance: CVRP) -> None:
+        """Otimiza usando o laço compilado de sa_kernel, com as mesmas perturbações
+        e cooling schedules do motor em Python. O kernel executa blocos de
+        kernel_chunk iterações e volta ao Python para checar o limite de tempo.
+
+        Args:
+            instance (CVRP): instância do CVRP
+        """
+        import sa_kernel
+        self.__seed_run(instance)
+        self.start_time = time()
+        self.initial_solution = build_initial_solution(instance, self.constructor)
+        initial = Solution.from_routes(instance, self.initial_solution)
+        
+        # buffers da solução atual, cópia para desfazer e melhor tour
+        tour = np.array(initial.tour, dtype=np.int64)
+        offsets = np.array(initial.offsets, dtype=np.int64)
+        costs = np.array(initial.costs, dtype=np.int64)
+        loads = np.array(initial.loads, dtype=np.int64)
+        backup_tour, backup_costs, backup_loads = tour.copy(), costs.copy(), loads.copy()
+        best_tour = tour.copy()
+        demand = np.asarray(instance.vertex_demand, dtype=np.int64)
+        # semente do kernel derivada da semente da execução (mesma semente, mesmo resultado)
+        sa_kernel.seed(instance.rng.randrange(2**32))
+        
+        self.best_solution_cost = current_s_cost = int(costs.sum())
+        iteration_n = 1
+        time_diff = 0.0
+        self.best_solution_time = 0.0
+        actual_temp = float(self.start_temp)
+        time_limit = self.__effective_time_limit()
+        while time_diff < time_limit and iteration_n < self.iteration_limit:
+            n_iterations = int(min(self.kernel_chunk, self.iteration_limit - iteration_n))
+            chunk_start, chunk_start_time = iteration_n, time_diff
+            iteration_n, current_s_cost, self.best_solution_cost, actual_temp, best_iteration = sa_kernel.anneal(
+                tour, offsets, costs, loads, instance.distance_matrix, demand, int(instance.truck_capacity),
+                backup_tour, backup_costs, backup_loads, best_tour,
+                iteration_n, n_iterations, current_s_cost, self.best_solution_cost, actual_temp,
+                float(self.start_temp), sa_kernel.COOLING_FUNCS[self.cooling_func], float(self.cooling_rate))
+            time_diff = time() - self.start_time
+            if best_iteration >= 0:
+                # instante da melhora interpolado dentro do bloco
+                fraction = (best_iteration - chunk_start) / n_iterations
+                self.best_solution_time = chunk_start_time + fraction * (time_diff - chunk_start_time)
+        self.best_solution = Solution.from_tour(instance, best_tour, offsets)
+        if self.final_local_search:
+            self.__intensify(instance, time_diff)
+        self.finish_time = time()
+        self.total_time_spent = self.finish_time - self.start_time
     
     def return_report(self) -> dict:
         """
         Retorna o dicionario com com os resultados salvos
         """
-        return {
+        report = {
             "best_cost": self.best_solution_cost,
             "time_for_best_sol": self.best_solution_time,
-            "best_solution": [self.best_solution],
-            }
\ No newline at end of file
+            "best_solution": [self.best_solution.to_list()],
+            "seed": self.run_seed,
+            }
+        if self.move_stats is not None:
+            report["move_stats"] = self.move_stats
+        return report
\ No newline at end of file
@@ -0,0 +1,219 @@
+from array import array
+
+
+class Solution:
+    """
+    Classe para representar uma solução do CVRP em buffers planos (array('i')).
+    As rotas ficam concatenadas em um único tour gigante, cada rota r ocupa
+    tour[offsets[r]:offsets[r+1]] e começa e termina no depósito. Mantém em cache,
+    para cada rota, o custo e a demanda atendida (carga) e, para cada vértice,
+    o índice da rota em que ele está e sua posição no tour.
+
+    As perturbações alteram a solução no próprio lugar (sem cópia): cada escrita
+    guarda o valor antigo em um registro, que é descartado com commit() quando
+    a nova solução é aceita ou desfeito com undo() quando ela é rejeitada.
+    """
+    __slots__ = ("tour", "offsets", "costs", "loads", "route_of", "pos", "_journal")
+    tour: array
+    offsets: array
+    costs: array
+    loads: array
+    route_of: array
+    pos: array
+
+    def __init__(self, tour: array, offsets: array, costs: array, loads: array, route_of: array, pos: array):
+        """
+        Cria a solução a partir dos buffers já calculados
+
+        Args:
+            tour (array): rotas concatenadas (com os depósitos)
+            offsets (array): início de cada rota no tour (len = n° de rotas + 1)
+            costs (array): custo de cada rota
+            loads (array): demanda total de cada rota
+            route_of (array): índice da rota de cada vértice (-1 para o depósito)
+            pos (array): posição de cada vértice no tour
+        """
+        self.tour = tour
+        self.offsets = offsets
+        self.costs = costs
+        self.loads = loads
+        self.route_of = route_of
+        self.pos = pos
+        # registro das alterações desde o último commit: ("t", início, valores antigos, rota)
+        # para o tour ou ("c"/"l", rota, valor antigo, None) para custo e carga
+        self._journal = []
+
+    @classmethod
+    def from_routes(cls, instance, routes: list[list[int]]) -> "Solution":
+        """Cria a solução calculando custo, carga e índices a partir das rotas
+
+        Args:
+            instance (CVRP): instância do problema
+            routes (list[list[int]]): rotas da solução
+
+        Returns:
+            Solution: solução com as informações em cache
+        """
+        tour = array("i")
+        offsets = array("i", [0])
+        for route in routes:
+            tour.extend(route)
+            offsets.append(len(tour))
+        route_of = array("i", [-1]) * len(instance.V)
+        pos = array("i", [-1]) * len(instance.V)
+        for route_idx, route in enumerate(routes):
+            for i in range(1, len(route) - 1):
+                route_of[route[i]] = route_idx
+                pos[route[i]] = offsets[route_idx] + i
+        return cls(
+            tour,
+            offsets,
+            array("q", instance.calculate_route_costs(routes)),
+            array("q", [int(sum(instance.vertex_demand[v] for v in route)) for route in routes]),
+            route_of,
+            pos,
+            )
+
+    @classmethod
+    def from_tour(cls, instance, tour, offsets) -> "Solution":
+        """Cria a solução a partir de um tour gigante e do início de cada rota
+
+        Args:
+            instance (CVRP): instância do problema
+            tour (Sequence[int]): rotas concatenadas (com os depósitos)
+            offsets (Sequence[int]): início de cada rota no tour (len = n° de rotas + 1)
+
+        Returns:
+            Solution: solução com as informações em cache
+        """
+        routes = [[int(v) for v in tour[offsets[r]:offsets[r + 1]]] for r in range(len(offsets) - 1)]
+        return cls.from_routes(instance, routes)
+
+    @property
+    def cost(self) -> int:
+        """
+        Custo total da solução (soma do custo das rotas)
+        """
+        return sum(self.costs)
+
+    @property
+    def number_of_routes(self) -> int:
+        """
+        Número de rotas da solução
+        """
+        return len(self.offsets) - 1
+
+    def bounds(self, route_idx: int) -> tuple[int, int]:
+        """Início e fim (exclusivo) da rota no tour
+
+        Args:
+            route_idx (int): índice da rota
+
+        Returns:
+            tuple[int, int]: posições [início, fim) da rota, incluindo os depósitos
+        """
+        return self.offsets[route_idx], self.offsets[route_idx + 1]
+
+    def route(self, route_idx: int) -> list[int]:
+        """Cópia de uma rota no formato de lista
+
+        Args:
+            route_idx (int): índice da rota
+
+        Returns:
+            list[int]: rota (começa e termina no depósito)
+        """
+        return self.tour[self.offsets[route_idx]:self.offsets[route_idx + 1]].tolist()
+
+    def route_len(self, route_idx: int) -> int:
+        """Tamanho da rota contando os depósitos
+
+        Args:
+            route_idx (int): índice da rota
+
+        Returns:
+            int: tamanho da rota
+        """
+        return self.offsets[route_idx + 1] - self.offsets[route_idx]
+
+    def write(self, start: int, values, route_idx: int):
+        """Escreve valores no tour a partir de uma posição (somente posições de clientes
+        de uma mesma rota), guardando os valores antigos para o undo
+
+        Args:
+            start (int): posição inicial no tour
+            values (Iterable[int]): novos vértices
+            route_idx (int): rota em que as posições estão
+        """
+        values = array("i", values)
+        stop = start + len(values)
+        self._journal.append(("t", start, self.tour[start:stop], route_idx))
+        self.tour[start:stop] = values
+        for i in range(start, stop):
+            v = self.tour[i]
+            self.pos[v] = i
+            self.route_of[v] = route_idx
+
+    def set_cost(self, route_idx: int, cost: int):
+        """Atualiza o custo em cache de uma rota (guardando o antigo para o undo)
+
+        Args:
+            route_idx (int): índice da rota
+            cost (int): novo custo
+        """
+        self._journal.append(("c", route_idx, self.costs[route_idx], None))
+        self.costs[route_idx] = cost
+
+    def set_load(self, route_idx: int, load: int):
+        """Atualiza a carga em cache de uma rota (guardando a antiga para o undo)
+
+        Args:
+            route_idx (int): índice da rota
+            load (int): nova carga
+        """
+        self._journal.append(("l", route_idx, self.loads[route_idx], None))
+        self.loads[route_idx] = load
+
+    def commit(self):
+        """
+        Aceita as alterações feitas desde o último commit
+        """
+        self._journal.clear()
+
+    def undo(self):
+        """
+        Desfaz as alterações feitas desde o último commit, na ordem inversa
+        """
+        journal = self._journal
+        while journal:
+            kind, idx, old, route_idx = journal.pop()
+            match kind:
+                case "t":
+                    self.tour[idx:idx + len(old)] = old
+                    for i in range(idx, idx + len(old)):
+                        v = self.tour[i]
+                        self.pos[v] = i
+                        self.route_of[v] = route_idx
+                case "c":
+                    self.costs[idx] = old
+                case "l":
+                    self.loads[idx] = old
+
+    def copy(self) -> "Solution":
+        """
+        Retorna uma cópia independente da solução (sem o registro de alterações)
+        """
+        return Solution(
+            array("i", self.tour),
+            array("i", self.offsets),
+            array("q", self.costs),
+            array("q", self.loads),
+            array("i", self.route_of),
+            array("i", self.pos),
+            )
+
+    def to_list(self) -> list[list[int]]:
+        """
+        Retorna as rotas no formato de lista de listas
+        """
+        return [self.route(r) for r in range(self.number_of_routes)]
@@ -0,0 +1,413 @@
+"""
+Serviço residente de resolução: um processo que fica no ar atendendo pedidos
+em HTTP no localhost (ou em um Unix socket), para que execuções curtas não
+paguem a cada vez a inicialização do interpretador, os imports, a leitura do
+.vrp e a matriz de distâncias. Os pedidos entram na fila de um pool de
+processos; cada processo guarda as últimas instâncias usadas em um cache LRU
+limitado (e, com cache_dir, a matriz vem do cache em .npy, compartilhado entre
+os processos pelo cache de páginas do sistema operacional).
+
+    python solver_service.py --port 8765 --root ../instances
+    curl -H 'Content-Type: application/json' \
+        -d '{"instance": "A/A-n32-k5.vrp", "time_limit": 1, "params": {"seed": 1}}' localhost:8765/solve
+
+O corpo da resposta é SimulatedAnnealing.return_report(). Os pedidos só podem
+escolher parâmetros da busca (ALLOWED_PARAMS, nada que grave arquivos) e têm o
+tempo e as iterações limitados, para nenhum pedido prender um processo para sempre;
+quem espera o resultado desiste depois de time_limit + timeout_margin segundos.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool, TimeoutError as PoolTimeoutError
+from cvrp import CVRP
+from simulated_annealing import SimulatedAnnealing
+
+# argumentos do SimulatedAnnealing aceitos nos pedidos: somente parâmetros da busca;
+# os que gravam arquivos (profile_path, trace_path, checkpoint_path) ficam de fora, assim
+# como kernel_chunk (o motor numba só olha o relógio entre os trechos)
+ALLOWED_PARAMS = {
+    "initial_temp", "cooling_func", "cooling_rate", "iteration_limit", "granular", "engine",
+    "batch_size", "batch_select", "constructor", "move_weights", "operator_selection", "seed",
+    "local_search_every", "final_local_search",
+}
+# construtores de tempo limitado ("random" sorteia rotas até achar uma solução viável);
+# o primeiro é o usado quando o pedido não escolhe
+ALLOWED_CONSTRUCTORS = ("savings", "sweep")
+# maior lote (cada candidato aloca alguns arrays do tamanho do lote)
+MAX_BATCH_SIZE = 4096
+# menor intervalo da busca local periódica (0 desliga)
+MIN_LOCAL_SEARCH_EVERY = 1000
+
+# cache das instâncias no processo do pool (configurado por _init_worker)
+_instances: OrderedDict[str, CVRP] = OrderedDict()
+_max_instances = 8
+_cache_dir: str | None = None
+
+
+def _init_worker(max_instances: int, cache_dir: str | None):
+    global _max_instances, _cache_dir
+    _max_instances = max_instances
+    _cache_dir = cache_dir
+
+
+def _get_instance(path: str) -> CVRP:
+    """
+    Instância do cache do processo (lida e colocada no cache se não estiver)
+    """
+    instance = _instances.get(path)
+    if instance is not None:
+        _instances.move_to_end(path)
+        return instance
+    instance = CVRP(path, cache_dir=_cache_dir)
+    _instances[path] = instance
+    while len(_instances) > _max_instances:
+        _instances.popitem(last=False)
+    return instance
+
+
+def solve_job(job: dict) -> dict:
+    """Executa um pedido (no processo do pool)
+
+    Args:
+        job (dict): "instance" (path já resolvido), "time_limit" e "params"
+            (argumentos do SimulatedAnnealing)
+
+    Returns:
+        dict: SimulatedAnnealing.return_report()
+    """
+    params = job.get("params", {})
+    if set(params) - ALLOWED_PARAMS:
+        # SolverService.validate já recusa, conferido de novo para quem chama direto
+        raise ValueError(f"parâmetros não permitidos: {sorted(set(params) - ALLOWED_PARAMS)}")
+    instance = _get_instance(job["instance"])
+    sa = SimulatedAnnealing(**params, time_limit=job.get("time_limit", 0.0))
+    sa.optimize(instance)
+    return sa.return_report()
+
+
+class SolverService:
+    """
+    Pool de processos que resolve os pedidos e controla o tamanho da fila
+    """
+    root: str
+    max_pending: int
+
+    max_time_limit: float
+    max_iterations: int
+    timeout_margin: float
+
+    def __init__(self, root: str = "./instances", processes: int = os.cpu_count(), max_instances: int = 8,
+                 cache_dir: str | None = None, max_pending: int = 1024, max_time_limit: float = 300.0,
+                 max_iterations: int = 2_000_000, timeout_margin: float = 30.0):
+        """
+        Args:
+            root (str, optional): pasta das instâncias; os pedidos só podem usar arquivos
+                dentro dela. Defaults to "./instances".
+            processes (int, optional): processos do pool. Defaults to os.cpu_count().
+            max_instances (int, optional): instâncias em cache em cada processo. Defaults to 8.
+            cache_dir (str | None, optional): pasta do cache binário das instâncias. Defaults to None.
+            max_pending (int, optional): pedidos na fila ou em execução além dos quais novos
+                pedidos são recusados. Defaults to 1024.
+            max_time_limit (float, optional): maior time_limit aceito em um pedido. Defaults to 300.0.
+            max_iterations (int, optional): maior iteration_limit aceito em um pedido (no modo
+                determinístico, sem limite de tempo). Defaults to 2_000_000.
+            timeout_margin (float, optional): folga além do time_limit (ou de max_time_limit,
+                no modo determinístico) antes de desistir de esperar o resultado. Defaults to 30.0.
+        """
+        self.root = os.path.realpath(root)
+        self.max_pending = max_pending
+        self.max_time_limit = max_time_limit
+        self.max_iterations = max_iterations
+        self.timeout_margin = timeout_margin
+        self.__pool = Pool(processes, initializer=_init_worker, initargs=(max_instances, cache_dir))
+        self.__pending = 0
+        self.__lock = threading.Lock()
+        self.solved = 0
+
+    def resolve_path(self, instance: str) -> str:
+        """Path do arquivo do pedido, relativo a root
+
+        Args:
+            instance (str): path relativo (ou absoluto dentro de root)
+
+        Raises:
+            FileNotFoundError: arquivo fora de root ou inexistente
+
+        Returns:
+            str: path absoluto
+        """
+        path = os.path.realpath(os.path.join(self.root, instance))
+        if os.path.commonpath([path, self.root]) != self.root or not os.path.isfile(path):
+            raise FileNotFoundError(instance)
+        return path
+
+    def validate(self, job: dict) -> dict:
+        """Confere o pedido e devolve a versão que vai para o pool
+
+        Args:
+            job (dict): pedido recebido
+
+        Raises:
+            ValueError: campo ausente, parâmetro não permitido ou limite acima do máximo
+            FileNotFoundError: instância não encontrada
+
+        Returns:
+            dict: "instance" (path absoluto), "time_limit" e "params"
+        """
+        if not isinstance(job, dict) or not isinstance(job.get("instance"), str):
+            raise ValueError("o pedido precisa do campo \"instance\"")
+        params = job.get("params", {})
+        if not isinstance(params, dict):
+            raise ValueError("\"params\" precisa ser um objeto")
+        forbidden = set(params) - ALLOWED_PARAMS
+        if forbidden:
+            raise ValueError(f"parâmetros não permitidos: {sorted(forbidden)}")
+        time_limit = float(job.get("time_limit", 0.0))
+        if not 0.0 <= time_limit <= self.max_time_limit:
+            raise ValueError(f"time_limit precisa estar entre 0 e {self.max_time_limit}")
+        if "iteration_limit" in params:
+            iteration_limit = float(params["iteration_limit"])
+            if not 0 <= iteration_limit <= self.max_iterations:
+                raise ValueError(f"iteration_limit precisa estar entre 0 e {self.max_iterations}")
+        if not 1 <= int(params.get("batch_size", 1)) <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size precisa estar entre 1 e {MAX_BATCH_SIZE}")
+        local_search_every = int(params.get("local_search_every", 0))
+        if local_search_every != 0 and local_search_every < MIN_LOCAL_SEARCH_EVERY:
+            raise ValueError(f"local_search_every precisa ser 0 ou pelo menos {MIN_LOCAL_SEARCH_EVERY}")
+        params = {"constructor": ALLOWED_CONSTRUCTORS[0], **params}
+        if params["constructor"] not in ALLOWED_CONSTRUCTORS:
+            raise ValueError(f"constructor precisa ser um de {list(ALLOWED_CONSTRUCTORS)}")
+        return {"instance": self.resolve_path(job["instance"]), "time_limit": time_limit, "params": params}
+
+    def solve(self, job: dict) -> dict:
+        """Coloca o pedido na fila do pool e espera o resultado
+
+        Args:
+            job (dict): "instance", "time_limit" (opcional) e "params" (opcional)
+
+        Raises:
+            OverflowError: fila cheia
+            FileNotFoundError: instância não encontrada
+            ValueError: pedido inválido
+            TimeoutError: o resultado não chegou em time_limit + timeout_margin (o processo
+                do pool que executava o pedido pode ter morrido)
+
+        Returns:
+            dict: SimulatedAnnealing.return_report()
+        """
+        job = self.validate(job)
+        with self.__lock:
+            if self.__pending >= self.max_pending:
+                raise OverflowError("fila cheia")
+            self.__pending += 1
+        timeout = (job["time_limit"] or self.max_time_limit) + self.timeout_margin
+        solved = False
+        try:
+            try:
+                report = self.__pool.apply_async(solve_job, (job,)).get(timeout)
+            except PoolTimeoutError:
+                raise TimeoutError(f"sem resultado em {timeout:g}s") from None
+            solved = True
+        finally:
+            with self.__lock:
+                self.__pending -= 1
+                self.solved += solved
+        return report
+
+    def status(self) -> dict:
+        """
+        Pedidos pendentes e resolvidos
+        """
+        with self.__lock:
+            return {"pending": self.__pending, "solved": self.solved, "max_pending": self.max_pending}
+
+    def close(self):
+        """
+        Encerra o pool
+        """
+        self.__pool.terminate()
+        self.__pool.join()
+
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /solve com o pedido em JSON; GET /status
+    """
+    server: "SolverHTTPServer"
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.__reply(200, self.server.service.status())
+        else:
+            self.__reply(404, {"error": "rota desconhecida"})
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self.__reply(404, {"error": "rota desconhecida"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            # formulários de uma página no navegador não conseguem mandar application/json
+            # sem preflight, então pedidos vindos de outros sites param aqui
+            self.__reply(415, {"error": "o pedido precisa ser application/json"})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            self.__reply(200, self.server.service.solve(job))
+        except FileNotFoundError as e:
+            self.__reply(404, {"error": f"instância não encontrada: {e}"})
+        except OverflowError as e:
+            self.__reply(503, {"error": str(e)})
+        except TimeoutError as e:
+            self.__reply(504, {"error": str(e)})
+        except (ValueError, TypeError) as e:
+            # JSON inválido, pedido sem instância, parâmetro não permitido ou acima do limite
+            self.__reply(400, {"error": str(e)})
+        except Exception as e:
+            self.__reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def __reply(self, status: int, body: dict):
+        # escalares do numpy (o motor numba devolve o custo como np.int64)
+        data = json.dumps(body, default=lambda value: value.item()).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # no Unix socket não há endereço do cliente
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class SolverHTTPServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP (uma thread por conexão esperando o pool) em TCP ou Unix socket
+    """
+    daemon_threads = True
+
+    def __init__(self, service: SolverService, host: str = "127.0.0.1", port: int = 8765,
+                 socket_path: str | None = None):
+        """
+        Args:
+            service (SolverService): pool que resolve os pedidos
+            host (str, optional): endereço TCP. Defaults to "127.0.0.1".
+            port (int, optional): porta TCP. Defaults to 8765.
+            socket_path (str | None, optional): se informado, escuta neste Unix socket
+                em vez de TCP. Defaults to None.
+        """
+        self.service = service
+        if socket_path is not None:
+            self.address_family = socket.AF_UNIX
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            super().__init__(socket_path, SolverRequestHandler)
+        else:
+            super().__init__((host, port), SolverRequestHandler)
+
+    def server_bind(self):
+        if self.address_family == socket.AF_UNIX:
+            # HTTPServer.server_bind espera (host, porta)
+            self.socket.bind(self.server_address)
+            self.server_name, self.server_port = "localhost", 0
+        else:
+            super().server_bind()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request_solve(instance: str, time_limit: float = 0.0, params: dict | None = None,
+                  host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None) -> dict:
+    """Envia um pedido ao serviço e espera a resposta
+
+    Args:
+        instance (str): path da instância relativo à pasta root do serviço
+        time_limit (float, optional): limite de tempo. Defaults to 0.0.
+        params (dict | None, optional): argumentos do SimulatedAnnealing. Defaults to None.
+        host (str, optional): endereço TCP do serviço. Defaults to "127.0.0.1".
+        port (int, optional): porta TCP do serviço. Defaults to 8765.
+        socket_path (str | None, optional): Unix socket do serviço (em vez de TCP). Defaults to None.
+
+    Raises:
+        RuntimeError: o serviço respondeu com erro
+
+    Returns:
+        dict: SimulatedAnnealing.return_report()
+    """
+    if socket_path is not None:
+        connection = _UnixHTTPConnection(socket_path)
+    else:
+        connection = http.client.HTTPConnection(host, port)
+    try:
+        body = json.dumps({"instance": instance, "time_limit": time_limit, "params": params or {}})
+        connection.request("POST", "/solve", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        data = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"{response.status}: {data['error']}")
+    return data
+
+
+def serve(root: str = "./instances", host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None,
+          processes: int = os.cpu_count(), max_instances: int = 8, cache_dir: str | None = None,
+          max_time_limit: float = 300.0, max_iterations: int = 2_000_000, timeout_margin: float = 30.0):
+    """Sobe o serviço e atende até ser interrompido (Ctrl+C)
+
+    Args:
+        root (str, optional): pasta das instâncias. Defaults to "./instances".
+        host (str, optional): endereço TCP. Defaults to "127.0.0.1".
+        port (int, optional): porta TCP. Defaults to 8765.
+        socket_path (str | None, optional): Unix socket em vez de TCP. Defaults to None.
+        processes (int, optional): processos do pool. Defaults to os.cpu_count().
+        max_instances (int, optional): instâncias em cache por processo. Defaults to 8.
+        cache_dir (str | None, optional): pasta do cache binário das instâncias. Defaults to None.
+        max_time_limit (float, optional): maior time_limit aceito em um pedido. Defaults to 300.0.
+        max_iterations (int, optional): maior iteration_limit aceito em um pedido. Defaults to 2_000_000.
+        timeout_margin (float, optional): folga além do time_limit antes de desistir do resultado.
+            Defaults to 30.0.
+    """
+    service = SolverService(root, processes, max_instances, cache_dir, max_time_limit=max_time_limit,
+                            max_iterations=max_iterations, timeout_margin=timeout_margin)
+    server = SolverHTTPServer(service, host, port, socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço residente do Simulated Annealing")
+    parser.add_argument("--root", default="./instances")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="Unix socket (em vez de TCP)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--max-instances", type=int, default=8)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--max-time-limit", type=float, default=300.0)
+    parser.add_argument("--max-iterations", type=int, default=2_000_000)
+    parser.add_argument("--timeout-margin", type=float, default=30.0)
+    args = parser.parse_args()
+    serve(args.root, args.host, args.port, args.socket, args.processes, args.max_instances, args.cache_dir,
+          args.max_time_limit, args.max_iterations, args.timeout_margin)
@@ -4,6 +4,6 @@ import simulated_annealing
 
 
 instance = cvrp.CVRP("./instances/A/A-n32-k5.vrp")
-sa = simulated_annealing.SimulatedAnnealing(100, 0.999, 300)
+sa = simulated_annealing.SimulatedAnnealing(initial_temp=100, cooling_func="exp", cooling_rate=0.999, time_limit=300)
 sa.optimize(instance)
 print(sa.return_report())
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Busca de parâmetros do Simulated Annealing por successive halving com racing:
+todas as configurações rodam primeiro com um limite de tempo curto, em paralelo
+(ver scheduler), e só a melhor fração 1/eta segue para a próxima rodada, com
+limite de tempo maior. Além do corte por posição, configurações estatisticamente
+piores que a líder (diferença pareada do gap por instância e repetição) são
+descartadas antes das execuções longas.
+
+Todas as execuções vão para um ResultsSink, então uma busca interrompida é
+retomada sem repetir as execuções já feitas.
+"""
+import itertools
+import json
+import math
+import os
+import numpy as np
+import scheduler
+from results_sink import ResultsSink
+
+# espaço padrão: o grid antigo de search_best_parameters mais os pesos das perturbações
+# (ordem de cvrp.MOVES: multiple insertion, two-way swap, 2-opt, guloso)
+DEFAULT_SPACE = {
+    "initial_temp": [100, 1000, 5000],
+    "cooling_func": ["exp", "lin", "log"],
+    "cooling_rate": [0.5555, 0.7777, 0.9999],
+    "move_weights": [None, [1, 1, 2, 0.5], [2, 1, 1, 0.5]],
+}
+
+
+def config_key(params: dict) -> str:
+    """Identificador de uma configuração
+
+    Args:
+        params (dict): parâmetros do SimulatedAnnealing
+
+    Returns:
+        str: parâmetros em JSON com as chaves ordenadas
+    """
+    return json.dumps(params, sort_keys=True)
+
+
+def _gaps(records: list[dict], configs: list[dict], time_limit: float) -> dict[str, dict[tuple, float]]:
+    """Gap relativo de cada execução da rodada: em relação ao ótimo da instância
+    ou, se não houver, ao melhor custo encontrado na rodada para a instância
+
+    Args:
+        records (list[dict]): execuções gravadas no ResultsSink
+        configs (list[dict]): configurações da rodada
+        time_limit (float): limite de tempo da rodada
+
+    Returns:
+        dict[str, dict[tuple, float]]: config_key -> {(instância, repetição): gap}
+    """
+    names = list(configs[0])
+    gaps = {config_key(params): {} for params in configs}
+    runs = []
+    for r in records:
+        key = config_key({name: r.get(name) for name in names})
+        if r.get("time_limit") == time_limit and key in gaps:
+            runs.append((key, r))
+    best_found = {}
+    for _, r in runs:
+        best_found[r["name"]] = min(best_found.get(r["name"], math.inf), r["best_cost"])
+    for key, r in runs:
+        reference = r["optimal_cost:"] or best_found[r["name"]]
+        gaps[key][(r["name"], r["instance_no"])] = (r["best_cost"] - reference) / reference
+    return gaps
+
+
+def _survivors(gaps: dict[str, dict[tuple, float]], keep: int, z: float) -> list[str]:
+    """Seleciona as configurações da próxima rodada
+
+    Args:
+        gaps (dict[str, dict[tuple, float]]): gaps da rodada (ver _gaps)
+        keep (int): máximo de configurações mantidas
+        z (float): quantil normal do teste pareado contra a líder (0 desliga o racing)
+
+    Returns:
+        list[str]: config_key das sobreviventes, da melhor para a pior
+    """
+    ranking = sorted(gaps, key=lambda key: np.mean(list(gaps[key].values())) if gaps[key] else math.inf)
+    leader = gaps[ranking[0]]
+    survivors = []
+    for key in ranking[:keep]:
+        common = sorted(leader.keys() & gaps[key].keys())
+        if key != ranking[0] and z > 0 and len(common) >= 2:
+            diff = np.array([gaps[key][run] - leader[run] for run in common])
+            # pior que a líder com significância: limite inferior do intervalo acima de 0
+            if diff.mean() - z * diff.std(ddof=1) / math.sqrt(len(diff)) > 0:
+                continue
+        survivors.append(key)
+    return survivors
+
+
+def successive_halving(instance_paths: list[str], space: dict[str, list] = DEFAULT_SPACE,
+                       min_time: float = 5.0, max_time: float = 300.0, eta: int = 3,
+                       repetitions: int = 1, z: float = 1.96, processes: int = os.cpu_count(),
+                       results_path: str = "tuning_results.jsonl", cache_dir: str | None = None) -> dict:
+    """Procura a melhor configuração do espaço. São ceil(log_eta(configurações)) rodadas
+    com limites de tempo em escala geométrica de min_time até max_time (a última rodada
+    sempre usa max_time); cada rodada mantém no máximo 1/eta das configurações
+
+    Args:
+        instance_paths (list[str]): arquivos .vrp usados na avaliação
+        space (dict[str, list], optional): valores de cada parâmetro do SimulatedAnnealing
+            (todas as combinações são avaliadas). Defaults to DEFAULT_SPACE.
+        min_time (float, optional): limite de tempo da primeira rodada. Defaults to 5.0.
+        max_time (float, optional): limite de tempo da última rodada. Defaults to 300.0.
+        eta (int, optional): fator de corte entre rodadas. Defaults to 3.
+        repetitions (int, optional): execuções de cada configuração por instância. Defaults to 1.
+        z (float, optional): quantil normal do descarte estatístico (0 desliga). Defaults to 1.96.
+        processes (int, optional): quantidade de processos. Defaults to os.cpu_count().
+        results_path (str, optional): arquivo .jsonl das execuções. Defaults to "tuning_results.jsonl".
+        cache_dir (str | None, optional): pasta do cache binário das instâncias. Defaults to None.
+
+    Returns:
+        dict: {"best_params": parâmetros, "rounds": [{"time_limit", "configs", "mean_gap"}, ...]}
+    """
+    configs = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    by_key = {config_key(params): params for params in configs}
+    # ceil(log_eta(configurações)) em aritmética inteira (o log em float erra nas potências exatas)
+    n_rounds, remaining = 1, len(configs)
+    while remaining > eta:
+        remaining = -(-remaining // eta)
+        n_rounds += 1
+    # a última rodada sempre usa max_time (com uma rodada só, geomspace devolveria [min_time])
+    time_limits = np.geomspace(min_time, max_time, n_rounds).round(1).tolist() if n_rounds > 1 else []
+    time_limits = time_limits[:-1] + [max_time]
+    rounds = []
+    with ResultsSink(results_path, key_fields=("name", "instance_no", "time_limit", *space)) as sink:
+        for round_i, time_limit in enumerate(time_limits):
+            if len(configs) == 1:
+                break
+            units = scheduler.make_units(instance_paths, repetitions, configs, time_limit, sink=sink)
+            scheduler.run_units(units, sink, processes=processes, cache_dir=cache_dir,
+                                desc=f"Rodada {round_i} ({len(configs)} configurações, {time_limit}s)")
+            gaps = _gaps(sink.records(), configs, time_limit)
+            keep = max(1, math.ceil(len(configs) / eta)) if round_i < n_rounds - 1 else 1
+            survivors = _survivors(gaps, keep, z)
+            rounds.append({
+                "time_limit": time_limit,
+                "configs": len(configs),
+                "mean_gap": {key: float(np.mean(list(g.values()))) for key, g in gaps.items() if g},
+                })
+            configs = [by_key[key] for key in survivors]
+    return {"best_params": configs[0], "rounds": rounds}